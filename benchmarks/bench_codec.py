@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# Throughput, latency percentiles and peak memory of the conversions over
+# generated Mesos workloads, raw SerializeToString/ParseFromString being the
+# floor the proxies are compared against.
+#
+#   python benchmarks/bench_codec.py --duration 1 --sizes 1 100 10000
+#   python benchmarks/bench_codec.py --workload offer --operation decode
+
+from __future__ import absolute_import, division, print_function
+
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..',
+                                'proxo', 'tests'))
+
+import mesos_pb2  # noqa
+import mesos  # noqa, registers the proxies
+from google.protobuf.internal import api_implementation  # noqa
+from proxo import decode, encode, dict_to_protobuf, protobuf_to_dict  # noqa
+
+
+def resources(count):
+    kinds = ['cpus', 'mem', 'disk', 'gpus']
+    items = []
+    for i in range(count):
+        if i % 5 == 4:
+            resource = mesos_pb2.Resource(name='ports',
+                                          type=mesos_pb2.Value.RANGES,
+                                          role='role-{}'.format(i % 3))
+            resource.ranges.range.add(begin=31000 + i, end=31100 + i)
+        else:
+            resource = mesos_pb2.Resource(name=kinds[i % 4],
+                                          type=mesos_pb2.Value.SCALAR)
+            resource.scalar.value = 0.5 * (i + 1)
+        items.append(resource)
+    return items
+
+
+def attributes(count):
+    items = []
+    for i in range(count):
+        attribute = mesos_pb2.Attribute(name='attribute-{}'.format(i),
+                                        type=mesos_pb2.Value.TEXT)
+        attribute.text.value = 'value-{}'.format(i)
+        items.append(attribute)
+    return items
+
+
+def container(size):
+    # docker container with volumes, networks and port mappings
+    info = mesos_pb2.ContainerInfo(type=mesos_pb2.ContainerInfo.DOCKER,
+                                   hostname='container')
+    info.docker.image = 'registry.example.com/service:latest'
+    info.docker.network = mesos_pb2.ContainerInfo.DockerInfo.BRIDGE
+    for i in range(size):
+        info.docker.port_mappings.add(host_port=31000 + i,
+                                      container_port=8000 + i,
+                                      protocol='tcp')
+        info.docker.parameters.add(key='env', value='KEY_{}=value'.format(i))
+        info.volumes.add(mode=mesos_pb2.Volume.RW,
+                         container_path='/data/{}'.format(i),
+                         host_path='/mnt/data/{}'.format(i))
+        network = info.network_infos.add(name='network-{}'.format(i))
+        network.ip_addresses.add(ip_address='10.0.{}.{}'.format(
+            i // 256 % 256, i % 256))
+        network.labels.labels.add(key='zone', value='zone-{}'.format(i % 3))
+    return info
+
+
+def offer(size):
+    pb = mesos_pb2.Offer(hostname='agent.example.com')
+    pb.id.value = 'offer-{}'.format(size)
+    pb.framework_id.value = 'framework'
+    pb.slave_id.value = 'agent'
+    pb.resources.extend(resources(size))
+    pb.attributes.extend(attributes(size))
+    return pb
+
+
+def task_info(size):
+    pb = mesos_pb2.TaskInfo(name='task', data=os.urandom(64))
+    pb.task_id.value = 'task-{}'.format(size)
+    pb.slave_id.value = 'agent'
+    pb.resources.extend(resources(size))
+    pb.command.value = 'sleep 100'
+    pb.command.uris.add(value='http://example.com/artifact.tar.gz')
+    pb.container.CopyFrom(container(size))
+    for i in range(size):
+        pb.labels.labels.add(key='label-{}'.format(i), value='value')
+    return pb
+
+
+def task_status(size):
+    pb = mesos_pb2.TaskStatus(state=mesos_pb2.TASK_RUNNING,
+                              message='status update', data=os.urandom(64),
+                              timestamp=time.time())
+    pb.task_id.value = 'task-{}'.format(size)
+    pb.slave_id.value = 'agent'
+    for i in range(size):
+        network = pb.container_status.network_infos.add()
+        network.ip_addresses.add(ip_address='10.0.{}.{}'.format(
+            i // 256 % 256, i % 256))
+    return pb
+
+
+WORKLOADS = {'offer': offer, 'task_info': task_info,
+             'task_status': task_status}
+
+
+def operations(pb):
+    # operation name -> (function, argument) with raw protobuf first
+    cls = pb.__class__
+    data = pb.SerializeToString()
+    mapping = protobuf_to_dict(pb)
+    proxy = decode(pb)
+    return [('serialize', pb.SerializeToString, ()),
+            ('parse', cls.FromString, (data,)),
+            ('protobuf_to_dict', protobuf_to_dict, (pb,)),
+            ('dict_to_protobuf', dict_to_protobuf, (mapping, cls)),
+            ('decode', decode, (pb,)),
+            ('encode', encode, (proxy,))]
+
+
+def latencies(func, args, duration, minimum=5):
+    timings = []
+    deadline = time.perf_counter() + duration
+    while len(timings) < minimum or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)
+
+
+def percentile(timings, q):
+    return timings[min(len(timings) - 1, int(q * len(timings)))]
+
+
+def peak_memory(func, args):
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workload', nargs='+', choices=sorted(WORKLOADS),
+                        default=sorted(WORKLOADS))
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[1, 100, 10000])
+    parser.add_argument('--operation', nargs='+')
+    parser.add_argument('--duration', type=float, default=0.5,
+                        help='seconds spent on each operation')
+    args = parser.parse_args()
+
+    print('protobuf backend: {}'.format(api_implementation.Type()))
+    print('{:>12} {:>6} {:>17} {:>10} {:>10} {:>10} {:>10} {:>9} {:>10}'
+          .format('workload', 'size', 'operation', 'ops/s', 'p50 us',
+                  'p90 us', 'p99 us', 'vs raw', 'peak KiB'))
+
+    for workload in args.workload:
+        for size in args.sizes:
+            pb = WORKLOADS[workload](size)
+            floor = {}
+            for name, func, fargs in operations(pb):
+                if args.operation and name not in args.operation:
+                    continue
+                timings = latencies(func, fargs, args.duration)
+                median = percentile(timings, 0.5)
+                # encoding directions against serialize, decoding ones
+                # against parse
+                raw = ('serialize' if name in ('serialize', 'encode',
+                                               'dict_to_protobuf')
+                       else 'parse')
+                floor.setdefault(name, median)
+                ratio = median / floor[raw] if raw in floor else float('nan')
+                print('{:>12} {:>6} {:>17} {:>10.1f} {:>10.1f} {:>10.1f} '
+                      '{:>10.1f} {:>8.1f}x {:>10.1f}'.format(
+                          workload, size, name, len(timings) / sum(timings),
+                          median * 1e6, percentile(timings, 0.9) * 1e6,
+                          percentile(timings, 0.99) * 1e6, ratio,
+                          peak_memory(func, fargs) / 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# Scaling of the pipelined thread-pool decoder with the number of threads,
+# compared to the sequential decode; parallel parsing only pays off with
+# protobuf backends releasing the GIL (cpp or upb).
+#
+#   python benchmarks/bench_threads.py --count 50000 --threads 1 2 4 8
+
+from __future__ import absolute_import, division, print_function
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..',
+                                'proxo', 'tests'))
+
+import mesos_pb2  # noqa
+from google.protobuf.internal import api_implementation  # noqa
+from proxo import decode  # noqa
+from proxo.parallel import decode_threaded  # noqa
+
+
+def payloads(count):
+    buffers = []
+    for i in range(count):
+        status = mesos_pb2.TaskStatus(state=mesos_pb2.TASK_RUNNING,
+                                      message='status update {}'.format(i),
+                                      data=os.urandom(64))
+        status.task_id.value = 'task-{}'.format(i)
+        status.slave_id.value = 'slave-{}'.format(i % 100)
+        buffers.append(status.SerializeToString())
+    return buffers
+
+
+def sequential(buffers):
+    for data in buffers:
+        decode(mesos_pb2.TaskStatus.FromString(data))
+
+
+def threaded(buffers, threads):
+    for _ in decode_threaded(buffers, mesos_pb2.TaskStatus, threads=threads):
+        pass
+
+
+def measure(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=20000)
+    parser.add_argument('--threads', type=int, nargs='+',
+                        default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    buffers = payloads(args.count)
+    print('protobuf backend: {}'.format(api_implementation.Type()))
+    print('{:>10} {:>12} {:>10}'.format('threads', 'msg/s', 'speedup'))
+
+    baseline = measure(sequential, buffers)
+    print('{:>10} {:>12.0f} {:>10.2f}'.format(
+        'seq', args.count / baseline, 1))
+    for threads in args.threads:
+        elapsed = measure(threaded, buffers, threads)
+        print('{:>10} {:>12.0f} {:>10.2f}'.format(
+            threads, args.count / elapsed, baseline / elapsed))
+
+
+if __name__ == '__main__':
+    main()
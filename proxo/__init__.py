@@ -1,5 +1,6 @@
 from .protobuf import dict_to_protobuf, protobuf_to_dict
 from .messages import MessageProxy, encode, decode
+from .patch import diff, apply_patch
 
 __version__ = '1.0.2'
 
@@ -8,4 +9,6 @@ __all__ = ('dict_to_protobuf',
            'encode',
            'decode',
            'MessageProxy',
+           'diff',
+           'apply_patch',
            '__version__')
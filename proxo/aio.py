@@ -0,0 +1,110 @@
+from __future__ import absolute_import, division, print_function
+
+import asyncio
+
+from .messages import decode
+from .recordio import parse_header
+from .stream import CHUNK_SIZE, encode_varint, parse, serialize
+
+__all__ = ('read_stream',
+           'write_stream',
+           'StreamWriter')
+
+
+THRESHOLD = 1 << 18  # frames above this size are decoded in an executor
+
+
+def _decode(proto, data):
+    return decode(parse(proto, data))
+
+
+def _frame(data, framing):
+    if framing == 'recordio':
+        return str(len(data)).encode('ascii') + b'\n', data
+    elif framing == 'varint':
+        return encode_varint(len(data)), data
+    else:
+        raise ValueError('Unknown framing {!r}'.format(framing))
+
+
+async def _read_length(reader, framing):
+    # returns None on a clean end of stream
+    if framing == 'recordio':
+        try:
+            header = await reader.readuntil(b'\n')
+        except asyncio.IncompleteReadError as e:
+            if e.partial:
+                raise EOFError('Truncated RecordIO header')
+            return None
+        length = parse_header(header[:-1])
+        if length is None:
+            raise ValueError('Invalid RecordIO header {!r}'.format(header))
+        return length
+    elif framing == 'varint':
+        result = shift = 0
+        while True:
+            byte = await reader.read(1)
+            if not byte:
+                if shift:
+                    raise EOFError('Truncated varint header')
+                return None
+            result |= (byte[0] & 0x7f) << shift
+            if not byte[0] & 0x80:
+                return result
+            shift += 7
+    else:
+        raise ValueError('Unknown framing {!r}'.format(framing))
+
+
+async def read_stream(reader, proto, framing='recordio', threshold=THRESHOLD,
+                      executor=None):
+    loop = asyncio.get_running_loop()
+    while True:
+        length = await _read_length(reader, framing)
+        if length is None:
+            return
+        try:
+            data = await reader.readexactly(length)
+        except asyncio.IncompleteReadError:
+            raise EOFError('Truncated message stream')
+        if length >= threshold:
+            yield await loop.run_in_executor(executor, _decode, proto, data)
+        else:
+            yield _decode(proto, data)
+
+
+class StreamWriter(object):
+    # batches small frames into a single write and applies backpressure
+    # through drain once the batch is flushed
+
+    def __init__(self, writer, framing='recordio', batch_size=CHUNK_SIZE):
+        self.writer = writer
+        self.framing = framing
+        self.batch_size = batch_size
+        self.parts = []
+        self.size = 0
+
+    async def write(self, proxy):
+        header, data = _frame(serialize(proxy), self.framing)
+        self.parts.extend((header, data))
+        self.size += len(header) + len(data)
+        if self.size >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        if self.parts:
+            self.writer.write(b''.join(self.parts))
+            self.parts, self.size = [], 0
+        await self.writer.drain()
+
+    async def close(self):
+        await self.flush()
+        self.writer.close()
+
+
+async def write_stream(writer, proxies, framing='recordio',
+                       batch_size=CHUNK_SIZE):
+    stream = StreamWriter(writer, framing=framing, batch_size=batch_size)
+    for proxy in proxies:
+        await stream.write(proxy)
+    await stream.flush()
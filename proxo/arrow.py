@@ -0,0 +1,222 @@
+from __future__ import absolute_import, division, print_function
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from itertools import islice
+from google.protobuf.descriptor import FieldDescriptor
+
+from .protobuf import enum_to_label, has_presence, label_to_enum
+
+__all__ = ('schema',
+           'to_record_batch',
+           'from_record_batch',
+           'write_parquet',
+           'read_parquet',
+           'ARROW_TYPE_MAP')
+
+
+ARROW_TYPE_MAP = {
+    FieldDescriptor.TYPE_DOUBLE: pa.float64(),
+    FieldDescriptor.TYPE_FLOAT: pa.float32(),
+    FieldDescriptor.TYPE_INT32: pa.int32(),
+    FieldDescriptor.TYPE_INT64: pa.int64(),
+    FieldDescriptor.TYPE_UINT32: pa.uint32(),
+    FieldDescriptor.TYPE_UINT64: pa.uint64(),
+    FieldDescriptor.TYPE_SINT32: pa.int32(),
+    FieldDescriptor.TYPE_SINT64: pa.int64(),
+    FieldDescriptor.TYPE_FIXED32: pa.uint32(),
+    FieldDescriptor.TYPE_FIXED64: pa.uint64(),
+    FieldDescriptor.TYPE_SFIXED32: pa.int32(),
+    FieldDescriptor.TYPE_SFIXED64: pa.int64(),
+    FieldDescriptor.TYPE_BOOL: pa.bool_(),
+    FieldDescriptor.TYPE_STRING: pa.string(),
+    FieldDescriptor.TYPE_BYTES: pa.binary(),
+    FieldDescriptor.TYPE_ENUM: pa.dictionary(pa.int32(), pa.string())
+}
+
+BATCH_SIZE = 1 << 14
+
+
+def is_map(field):
+    return (field.type == FieldDescriptor.TYPE_MESSAGE and
+            field.message_type.GetOptions().map_entry)
+
+
+def _value_type(field, seen):
+    if is_map(field):
+        key, value = field.message_type.fields
+        return pa.map_(_value_type(key, seen), _value_type(value, seen))
+    elif field.type == FieldDescriptor.TYPE_MESSAGE:
+        return pa.struct(_fields(field.message_type, seen))
+    else:
+        return ARROW_TYPE_MAP[field.type]
+
+
+def _fields(descriptor, seen=()):
+    if descriptor.full_name in seen:
+        raise ValueError('Recursive message {} cannot be mapped to an arrow '
+                         'schema'.format(descriptor.full_name))
+    seen = seen + (descriptor.full_name,)
+
+    fields = []
+    for field in descriptor.fields:
+        typ = _value_type(field, seen)
+        if field.label == FieldDescriptor.LABEL_REPEATED and not is_map(field):
+            typ = pa.list_(typ)
+        fields.append(pa.field(field.name, typ))
+    return fields
+
+
+def schema(descriptor):
+    return pa.schema(_fields(descriptor))
+
+
+# converters are compiled once per descriptor
+
+_to_row = {}
+_from_row = {}
+
+
+def _scalar_to_python(field):
+    if field.type == FieldDescriptor.TYPE_ENUM:
+        return lambda value: enum_to_label(field, value)
+    elif field.type == FieldDescriptor.TYPE_MESSAGE:
+        return row_converter(field.message_type)
+    return None
+
+
+def row_converter(descriptor):
+    try:
+        return _to_row[descriptor]
+    except KeyError:
+        pass
+
+    plan = []
+    for field in descriptor.fields:
+        if is_map(field):
+            key, value = field.message_type.fields
+            convert = _scalar_to_python(value)
+            if convert is None:
+                def getter(pb, name=field.name):
+                    return list(getattr(pb, name).items())
+            else:
+                def getter(pb, name=field.name, convert=convert):
+                    return [(k, convert(v))
+                            for k, v in getattr(pb, name).items()]
+        elif field.label == FieldDescriptor.LABEL_REPEATED:
+            convert = _scalar_to_python(field)
+            if convert is None:
+                def getter(pb, name=field.name):
+                    return list(getattr(pb, name))
+            else:
+                def getter(pb, name=field.name, convert=convert):
+                    return list(map(convert, getattr(pb, name)))
+        else:
+            convert = _scalar_to_python(field) or (lambda value: value)
+            if has_presence(field):
+                def getter(pb, name=field.name, convert=convert):
+                    if pb.HasField(name):
+                        return convert(getattr(pb, name))
+                    return None
+            else:
+                def getter(pb, name=field.name, convert=convert):
+                    return convert(getattr(pb, name))
+        plan.append((field.name, getter))
+
+    def convert(pb):
+        return {name: getter(pb) for name, getter in plan}
+
+    return _to_row.setdefault(descriptor, convert)
+
+
+def _scalar_from_python(field):
+    if field.type == FieldDescriptor.TYPE_ENUM:
+        return lambda value: label_to_enum(field, value)
+    return None
+
+
+def row_filler(descriptor):
+    try:
+        return _from_row[descriptor]
+    except KeyError:
+        pass
+
+    plan = {}
+    for field in descriptor.fields:
+        if is_map(field):
+            key, value = field.message_type.fields
+            if value.type == FieldDescriptor.TYPE_MESSAGE:
+                def setter(pb, items, name=field.name,
+                           fill=row_filler(value.message_type)):
+                    container = getattr(pb, name)
+                    for k, v in items:
+                        fill(container[k], v)
+            else:
+                def setter(pb, items, name=field.name,
+                           convert=_scalar_from_python(value)):
+                    if convert is not None:
+                        items = [(k, convert(v)) for k, v in items]
+                    getattr(pb, name).update(items)
+        elif field.type == FieldDescriptor.TYPE_MESSAGE:
+            fill = row_filler(field.message_type)
+            if field.label == FieldDescriptor.LABEL_REPEATED:
+                def setter(pb, rows, name=field.name, fill=fill):
+                    container = getattr(pb, name)
+                    for row in rows:
+                        fill(container.add(), row)
+            else:
+                def setter(pb, row, name=field.name, fill=fill):
+                    fill(getattr(pb, name), row)
+                    getattr(pb, name).SetInParent()
+        elif field.label == FieldDescriptor.LABEL_REPEATED:
+            def setter(pb, values, name=field.name,
+                       convert=_scalar_from_python(field)):
+                if convert is not None:
+                    values = map(convert, values)
+                getattr(pb, name).extend(values)
+        else:
+            def setter(pb, value, name=field.name,
+                       convert=_scalar_from_python(field)):
+                setattr(pb, name, value if convert is None else convert(value))
+        plan[field.name] = setter
+
+    def fill(pb, row):
+        for name, value in row.items():
+            if value is not None:
+                plan[name](pb, value)
+        return pb
+
+    return _from_row.setdefault(descriptor, fill)
+
+
+def to_record_batch(messages, descriptor=None):
+    messages = list(messages)
+    if descriptor is None:
+        descriptor = messages[0].DESCRIPTOR
+    arrow_schema = schema(descriptor)  # rejects recursive messages
+    convert = row_converter(descriptor)
+    return pa.RecordBatch.from_pylist([convert(pb) for pb in messages],
+                                      schema=arrow_schema)
+
+
+def from_record_batch(batch, proto):
+    fill = row_filler(proto.DESCRIPTOR)
+    return [fill(proto(), row) for row in batch.to_pylist()]
+
+
+def write_parquet(where, messages, proto, batch_size=BATCH_SIZE, **kwargs):
+    # streams record batches of batch_size messages into a parquet file
+    messages = iter(messages)
+    with pq.ParquetWriter(where, schema(proto.DESCRIPTOR), **kwargs) as w:
+        while True:
+            batch = list(islice(messages, batch_size))
+            if not batch:
+                break
+            w.write_batch(to_record_batch(batch, proto.DESCRIPTOR))
+
+
+def read_parquet(where, proto, batch_size=BATCH_SIZE):
+    for batch in pq.ParquetFile(where).iter_batches(batch_size=batch_size):
+        for pb in from_record_batch(batch, proto):
+            yield pb
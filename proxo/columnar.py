@@ -0,0 +1,151 @@
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+
+from operator import attrgetter
+from google.protobuf.descriptor import FieldDescriptor
+
+from google.protobuf.message import Message
+
+from .protobuf import label_to_enum, scalar_path
+
+__all__ = ('decode_columns',
+           'encode_columns',
+           'DTYPE_MAP')
+
+
+DTYPE_MAP = {
+    FieldDescriptor.TYPE_DOUBLE: np.float64,
+    FieldDescriptor.TYPE_FLOAT: np.float32,
+    FieldDescriptor.TYPE_INT32: np.int32,
+    FieldDescriptor.TYPE_INT64: np.int64,
+    FieldDescriptor.TYPE_UINT32: np.uint32,
+    FieldDescriptor.TYPE_UINT64: np.uint64,
+    FieldDescriptor.TYPE_SINT32: np.int32,
+    FieldDescriptor.TYPE_SINT64: np.int64,
+    FieldDescriptor.TYPE_FIXED32: np.uint32,
+    FieldDescriptor.TYPE_FIXED64: np.uint64,
+    FieldDescriptor.TYPE_SFIXED32: np.int32,
+    FieldDescriptor.TYPE_SFIXED64: np.int64,
+    FieldDescriptor.TYPE_BOOL: np.bool_,
+    FieldDescriptor.TYPE_STRING: object,
+    FieldDescriptor.TYPE_BYTES: object,
+    FieldDescriptor.TYPE_ENUM: np.int32
+}
+
+
+def enum_labels(field, codes):
+    labels = field.enum_type.values_by_number
+    uniques, inverse = np.unique(codes, return_inverse=True)
+    names = np.array([labels[int(code)].name for code in uniques],
+                     dtype=object)
+    return names[inverse]
+
+
+def decode_columns(messages, fields, proto=None, enums='codes',
+                   structured=False):
+    # fills one preallocated array per scalar field path in a single pass
+    # over the messages, enums are kept as integer codes or mapped to labels
+    if enums not in ('codes', 'labels'):
+        raise ValueError('enums must be either codes or labels')
+    if not hasattr(messages, '__len__'):
+        messages = list(messages)
+    if proto is None:
+        if not len(messages):
+            raise ValueError('Message type is required for empty input')
+        proto = messages[0]
+
+    leaves = [scalar_path(proto.DESCRIPTOR, path) for path in fields]
+    getters = [attrgetter(path) for path in fields]
+    columns = [np.empty(len(messages), dtype=DTYPE_MAP[leaf.type])
+               for leaf in leaves]
+
+    plan = list(zip(getters, columns))
+    for i, pb in enumerate(messages):
+        for getter, column in plan:
+            column[i] = getter(pb)
+
+    if enums == 'labels':
+        columns = [enum_labels(leaf, column)
+                   if leaf.type == FieldDescriptor.TYPE_ENUM else column
+                   for leaf, column in zip(leaves, columns)]
+
+    if structured:
+        dtype = [(path, column.dtype) for path, column in zip(fields, columns)]
+        result = np.empty(len(messages), dtype=dtype)
+        for path, column in zip(fields, columns):
+            result[path] = column
+        return result
+    else:
+        return dict(zip(fields, columns))
+
+
+def column_setter(descriptor, path):
+    field = scalar_path(descriptor, path)
+    parent, _, name = path.rpartition('.')
+    getter = attrgetter(parent) if parent else None
+
+    def setter(pb, value):
+        setattr(getter(pb) if getter else pb, name, value)
+
+    return field, setter
+
+
+def column_values(field, values):
+    # numpy scalars and arrays are converted to python objects, enum labels
+    # to their numbers
+    if isinstance(values, np.ndarray):
+        values = values.tolist()
+    elif isinstance(values, np.generic):
+        values = values.item()
+    if field.type == FieldDescriptor.TYPE_ENUM:
+        if isinstance(values, list):
+            values = [label_to_enum(field, v) if not isinstance(v, int)
+                      else v for v in values]
+        elif not isinstance(values, int):
+            values = label_to_enum(field, values)
+    return values
+
+
+def encode_columns(columns, proto, into=None, serialize=False):
+    # builds one message per row; scalars are broadcast to every row through
+    # a template message which also carries the proxy prototype defaults
+    prototype = None
+    if not isinstance(proto, Message) and hasattr(proto, 'registry'):
+        proto = proto.proto  # proxy class
+    if isinstance(proto, Message):
+        prototype, proto = proto, proto.__class__
+
+    template = proto()
+    if prototype is not None:
+        template.MergeFrom(prototype)
+
+    length, plan = None, []
+    for path, values in columns.items():
+        field, setter = column_setter(proto.DESCRIPTOR, path)
+        if np.ndim(values) == 0:
+            setter(template, column_values(field, values))
+            continue
+        values = column_values(field, values)
+        if length is None:
+            length = len(values)
+        elif len(values) != length:
+            raise ValueError('Columns must have the same length')
+        plan.append((setter, values))
+
+    if length is None:
+        length = 1  # only scalars given
+    has_template = template.ListFields()
+
+    messages = []
+    for i in range(length):
+        pb = proto() if into is None else into.add()
+        if has_template:
+            pb.MergeFrom(template)
+        for setter, values in plan:
+            setter(pb, values[i])
+        messages.append(pb)
+
+    if serialize:
+        return [pb.SerializePartialToString() for pb in messages]
+    return messages
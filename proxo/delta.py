@@ -0,0 +1,163 @@
+from __future__ import absolute_import, division, print_function
+
+from collections import OrderedDict
+
+from google.protobuf.field_mask_pb2 import FieldMask
+
+from .messages import freeze
+from .patch import apply_patch, diff, field_mask, partial_message
+from .stream import (CHUNK_SIZE, decode, encode_varint, decode_varint, parse,
+                     read_frames, serialize, write_frames)
+
+__all__ = ('DeltaEncoder',
+           'DeltaDecoder',
+           'write_deltas',
+           'read_deltas')
+
+
+# every frame starts with its kind, keyframes carry the whole message and
+# deltas a field mask followed by the partial message with the new values
+
+KEYFRAME, DELTA = b'\x00', b'\x01'
+INTERVAL = 64  # at most INTERVAL - 1 deltas between the keyframes of a key
+KEYS = 4096  # messages kept per stream, the least recently seen are evicted
+
+
+def _key(proxy, names):
+    if not names:
+        return None  # a single chain
+    for name in names:
+        proxy = proxy.get(name) if proxy is not None else None
+    return freeze(proxy)  # hashable
+
+
+class Chains(object):
+    # the previous message of each key, bounded like the flyweight caches;
+    # encoders and decoders of a stream see the keys in the same order so
+    # they evict the same ones given the same size, the encoder writes a
+    # keyframe for evicted keys
+
+    def __init__(self, size):
+        self.size = size
+        self.previous = OrderedDict()
+
+    def __len__(self):
+        return len(self.previous)
+
+    def __contains__(self, key):
+        return key in self.previous
+
+    def get(self, key, default=None):
+        return self.previous.get(key, default)
+
+    def put(self, key, value):
+        self.previous[key] = value
+        self.previous.move_to_end(key)
+        if len(self.previous) > self.size:
+            self.previous.popitem(last=False)
+
+    def discard(self, key):
+        self.previous.pop(freeze(key), None)
+
+    def clear(self):
+        self.previous.clear()
+
+
+class DeltaEncoder(object):
+    # the key path (e.g. task_id.value) selects the chain of messages a
+    # message is diffed against, it's repeated in every delta frame; the
+    # chains of at most keys keys are kept, finished ones (e.g. of tasks in
+    # terminal states) can be dropped by discard on both sides
+
+    def __init__(self, proto, key=None, interval=INTERVAL, keys=KEYS):
+        self.proto = proto
+        self.key = key
+        self.names = key.split('.') if key else ()
+        self.interval = interval
+        # key -> (frozen message, frames since keyframe)
+        self.previous = Chains(keys)
+
+    def encode(self, proxy):
+        current = freeze(proxy)  # later changes of proxy don't leak in
+        key = _key(current, self.names)
+        previous, count = self.previous.get(key, (None, 0))
+
+        if previous is None or count + 1 >= self.interval:
+            self.previous.put(key, (current, 0))
+            return KEYFRAME + serialize(proxy)
+
+        self.previous.put(key, (current, count + 1))
+        patch = diff(previous, current, self.proto.DESCRIPTOR)
+        if self.key:
+            patch[self.key] = key
+        mask = field_mask(patch).SerializeToString()
+        # the partial message lacks the unchanged required fields
+        partial = partial_message(patch, self.proto)
+        partial = partial.SerializePartialToString()
+        return b''.join((DELTA, encode_varint(len(mask)), mask, partial))
+
+    def discard(self, key):
+        # the next message of key is written as a keyframe
+        self.previous.discard(key)
+
+    def reset(self):
+        self.previous.clear()
+
+
+def _thaw(proxy):
+    cls = getattr(proxy.__class__, '_thawed', proxy.__class__)
+    thawed = cls.__new__(cls)
+    dict.update(thawed, proxy)
+    return thawed
+
+
+class DeltaDecoder(object):
+    # reconstructs read-only proxies, unchanged subtrees are shared with the
+    # previous message of the same key
+
+    def __init__(self, proto, key=None, keys=KEYS):
+        self.proto = proto
+        self.names = key.split('.') if key else ()
+        self.previous = Chains(keys)  # at least as many as the encoder's
+
+    def decode(self, frame):
+        kind, frame = bytes(frame[:1]), frame[1:]
+        if kind == KEYFRAME:
+            current = freeze(decode(parse(self.proto, frame)))
+            self.previous.put(_key(current, self.names), current)
+            return current
+        elif kind != DELTA:
+            raise ValueError('Unknown frame kind {!r}'.format(kind))
+
+        length, pos = decode_varint(frame)
+        mask = parse(FieldMask, frame[pos:pos + length])
+        partial = self.proto()  # merging skips the required fields check
+        partial.MergeFromString(bytes(frame[pos + length:]))
+
+        key = _key(decode(partial), self.names) if self.names else None
+        previous = self.previous.get(key)
+        if previous is None:
+            raise KeyError('Delta frame without preceding keyframe')
+
+        # patching thaws the changed paths only, the rest stays shared
+        current = freeze(apply_patch(_thaw(previous), mask, partial))
+        self.previous.put(key, current)
+        return current
+
+    def discard(self, key):
+        self.previous.discard(key)
+
+    def reset(self):
+        self.previous.clear()
+
+
+def write_deltas(fileobj, proxies, proto, key=None, interval=INTERVAL,
+                 chunk_size=CHUNK_SIZE, keys=KEYS):
+    encoder = DeltaEncoder(proto, key, interval, keys)
+    write_frames(fileobj, map(encoder.encode, proxies), chunk_size)
+
+
+def read_deltas(fileobj, proto, key=None, chunk_size=CHUNK_SIZE, keys=KEYS):
+    decoder = DeltaDecoder(proto, key, keys)
+    for frame in read_frames(fileobj, chunk_size):
+        yield decoder.decode(frame)
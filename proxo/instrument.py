@@ -0,0 +1,129 @@
+from __future__ import absolute_import, division, print_function
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+from . import protobuf
+
+__all__ = ('Stats',
+           'enable',
+           'disable',
+           'instrumented',
+           'logging_sink')
+
+
+clock = getattr(time, 'perf_counter', time.time)
+
+
+def _class_name(cls):
+    cls = getattr(cls, '_thawed', cls)  # frozen and tracked variants
+    return '{}.{}'.format(cls.__module__, cls.__name__)
+
+
+class Stats(object):
+    # counts, inclusive seconds (nested messages are counted in their parents
+    # too) and serialized bytes per message type of both directions, and the
+    # registry matches per proxy class
+
+    def __init__(self, sink=None, sizes=True):
+        self.sink = sink
+        self.sizes = sizes  # ByteSize isn't free with the python backend
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.decodes = {}  # full name -> [count, seconds, bytes]
+            self.encodes = {}
+            self.hits = {}  # proxy class -> messages converted through it
+            self.misses = {}  # full name -> plain dict fallbacks
+
+    def enter(self, obj):
+        return clock()
+
+    def _record(self, records, pb, started, proxy):
+        elapsed = clock() - started
+        name = pb.DESCRIPTOR.full_name
+        size = pb.ByteSize() if self.sizes else 0
+        with self.lock:
+            record = records.setdefault(name, [0, 0.0, 0])
+            record[0] += 1
+            record[1] += elapsed
+            record[2] += size
+            if proxy is None:
+                self.misses[name] = self.misses.get(name, 0) + 1
+            else:
+                proxy = _class_name(proxy)
+                self.hits[proxy] = self.hits.get(proxy, 0) + 1
+
+    def decoded(self, started, pb, result):
+        proxy = None if type(result) is dict else type(result)
+        self._record(self.decodes, pb, started, proxy)
+
+    def encoded(self, started, dct, pb, matched):
+        self._record(self.encodes, pb, started,
+                     type(dct) if matched else None)
+
+    def snapshot(self):
+        # flat mapping of prometheus style metric names to values
+        metrics = {}
+        with self.lock:
+            for direction, records in (('decode', self.decodes),
+                                       ('encode', self.encodes)):
+                for name, (count, seconds, size) in records.items():
+                    labels = '{{type="{}"}}'.format(name)
+                    prefix = 'proxo_{}_'.format(direction)
+                    metrics[prefix + 'total' + labels] = count
+                    metrics[prefix + 'seconds_total' + labels] = seconds
+                    if self.sizes:
+                        metrics[prefix + 'bytes_total' + labels] = size
+            for proxy, count in self.hits.items():
+                labels = '{{proxy="{}"}}'.format(proxy)
+                metrics['proxo_registry_hits_total' + labels] = count
+            for name, count in self.misses.items():
+                labels = '{{type="{}"}}'.format(name)
+                metrics['proxo_registry_misses_total' + labels] = count
+        return metrics
+
+    def report(self):
+        metrics = self.snapshot()
+        if self.sink is not None:
+            self.sink(metrics)
+        return metrics
+
+
+def logging_sink(logger=None, level=logging.INFO):
+    logger = logger or logging.getLogger('proxo.instrument')
+
+    def sink(metrics):
+        for name in sorted(metrics):
+            logger.log(level, '%s %s', name, metrics[name])
+    return sink
+
+
+def enable(sink=None, sizes=True):
+    # conversions are recorded process-wide until disable is called
+    stats = Stats(sink, sizes)
+    protobuf.tracer = stats
+    return stats
+
+
+def disable():
+    stats, protobuf.tracer = protobuf.tracer, None
+    if isinstance(stats, Stats):
+        stats.report()
+    return stats
+
+
+@contextmanager
+def instrumented(sink=None, sizes=True):
+    previous = protobuf.tracer
+    stats = Stats(sink, sizes)
+    protobuf.tracer = stats
+    try:
+        yield stats
+    finally:
+        protobuf.tracer = previous
+        stats.report()
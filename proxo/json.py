@@ -0,0 +1,396 @@
+from __future__ import absolute_import, division, print_function
+
+import json
+import math
+import base64
+
+import six
+from google.protobuf.descriptor import FieldDescriptor
+from google.protobuf.message import Message
+from google.protobuf.json_format import MessageToDict, ParseDict
+
+from .messages import Map, decode, encode
+from .protobuf import (ANY, SCALAR, ENUM, MAP, MESSAGE, field_plan,
+                       label_to_enum)
+from .wellknown import WELL_KNOWN_TYPES, REVERSE_WELL_KNOWN_TYPES, pack
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+__all__ = ('dumps',
+           'loads',
+           'to_json',
+           'from_json')
+
+
+# protobuf JSON mapping: 64 bit integers as strings, bytes as base64,
+# enums as labels and non-finite floats as strings, well-known types in
+# their special representations; fields holding their default values are
+# omitted unless including_default_value_fields is set
+
+INT64_TYPES = (FieldDescriptor.TYPE_INT64, FieldDescriptor.TYPE_UINT64,
+               FieldDescriptor.TYPE_SINT64, FieldDescriptor.TYPE_FIXED64,
+               FieldDescriptor.TYPE_SFIXED64)
+FLOAT_TYPES = (FieldDescriptor.TYPE_DOUBLE, FieldDescriptor.TYPE_FLOAT)
+TIME_TYPES = ('google.protobuf.Timestamp', 'google.protobuf.Duration')
+STRUCT_TYPES = ('google.protobuf.Struct', 'google.protobuf.Value',
+                'google.protobuf.ListValue')
+INT_TYPES = INT64_TYPES + (
+    FieldDescriptor.TYPE_INT32, FieldDescriptor.TYPE_UINT32,
+    FieldDescriptor.TYPE_SINT32, FieldDescriptor.TYPE_FIXED32,
+    FieldDescriptor.TYPE_SFIXED32)
+
+
+def _float_to_json(value):
+    if math.isnan(value):
+        return 'NaN'
+    elif math.isinf(value):
+        return 'Infinity' if value > 0 else '-Infinity'
+    return value
+
+
+def _bytes_to_json(value):
+    return base64.b64encode(value).decode('ascii')
+
+
+def _float_from_json(value):
+    return float(value)  # float('NaN') and float('-Infinity') work too
+
+
+def _bytes_from_json(value):
+    value = value.encode('ascii')
+    if b'-' in value or b'_' in value:
+        return base64.urlsafe_b64decode(value + b'=' * (-len(value) % 4))
+    return base64.b64decode(value + b'=' * (-len(value) % 4))
+
+
+def _enum_to_json(field):
+    labels = field.enum_type.values_by_number
+
+    def convert(value):
+        if isinstance(value, six.integer_types):
+            return labels[value].name
+        return value
+    return convert
+
+
+def _enum_from_json(field):
+    def convert(value):
+        if isinstance(value, six.integer_types):
+            return value
+        return label_to_enum(field, value)
+    return convert
+
+
+def _int_from_json(value):
+    return int(value)
+
+
+def _key_from_json(field):
+    if field.type == FieldDescriptor.TYPE_BOOL:
+        return lambda key: key == 'true'
+    elif field.type in INT_TYPES:
+        return int
+    return None
+
+
+def _key_to_json(field):
+    if field.type == FieldDescriptor.TYPE_BOOL:
+        return lambda key: 'true' if key else 'false'
+    elif field.type != FieldDescriptor.TYPE_STRING:
+        return str
+    return None
+
+
+def _identity(value):
+    return value
+
+
+def _repeated(convert):
+    return lambda values: [convert(v) for v in values]
+
+
+# serialization plans, derived from the cached field plans
+
+_to_json_plans = {}
+_from_json_plans = {}
+_plain = (dict, Map)
+
+
+def _any_to_json(value):
+    # rarely used, falls back to the reference implementation
+    if isinstance(value, dict):
+        value = encode(value)
+    return MessageToDict(pack(value))
+
+
+def _well_known_to_json(descriptor):
+    full_name = descriptor.full_name
+    if full_name in TIME_TYPES:
+        to_message = REVERSE_WELL_KNOWN_TYPES[full_name]
+        return lambda value: to_message(value).ToJsonString()
+    elif full_name in STRUCT_TYPES:
+        return _generic_to_json
+    elif full_name == ANY:
+        return _any_to_json
+    else:  # wrappers are unboxed scalars
+        value = descriptor.fields_by_name['value']
+        return _value_to_json(value, SCALAR, False, False) or _identity
+
+
+def _value_to_json(field, kind, preserving_proto_field_name,
+                   including_default_value_fields):
+    if kind == MESSAGE and field.message_type.full_name in WELL_KNOWN_TYPES:
+        return _well_known_to_json(field.message_type)
+    elif kind == MESSAGE:
+        descriptor = field.message_type
+        return lambda value: _message_to_json(
+            value, descriptor, preserving_proto_field_name,
+            including_default_value_fields, nested=True)
+    elif kind == ENUM:
+        return _enum_to_json(field)
+    elif field.type in INT64_TYPES:
+        return str
+    elif field.type in FLOAT_TYPES:
+        return _float_to_json
+    elif field.type == FieldDescriptor.TYPE_BYTES:
+        return _bytes_to_json
+    return None
+
+
+_KEEP, _EMPTY = object(), object()
+
+
+def _default(field, kind, repeated, oneof):
+    # value of an omitted field, _EMPTY if it's omitted when converted to an
+    # empty container; decoded proxies hold every field so presence can't
+    # be told apart from defaults, proto2 fields set to their defaults are
+    # omitted too (required ones are kept unless the whole message is)
+    if oneof is not None or (kind == MESSAGE and not repeated and
+                             field.message_type.full_name in WELL_KNOWN_TYPES):
+        return _KEEP  # present only if set
+    elif kind in (MAP, MESSAGE) or repeated:
+        return _EMPTY
+    elif kind == ENUM:
+        return field.enum_type.values_by_number[field.default_value].name
+    return field.default_value
+
+
+def to_json_plan(descriptor, preserving_proto_field_name=False,
+                 including_default_value_fields=False):
+    key = (descriptor, preserving_proto_field_name,
+           including_default_value_fields)
+    try:
+        return _to_json_plans[key]
+    except KeyError:
+        pass
+
+    plan = []
+    for name, field, kind, repeated, oneof in field_plan(descriptor).values():
+        json_name = name if preserving_proto_field_name else field.json_name
+        default = (_KEEP if including_default_value_fields else
+                   _default(field, kind, repeated, oneof))
+        if kind == MAP:
+            key_field, value_field = field.message_type.fields
+            convert_key = _key_to_json(key_field) or _identity
+            convert_value = _value_to_json(
+                value_field, field_plan(field.message_type)['value'].kind,
+                preserving_proto_field_name,
+                including_default_value_fields) or _identity
+
+            def convert(items, convert_key=convert_key,
+                        convert_value=convert_value):
+                return {convert_key(k): convert_value(v)
+                        for k, v in items.items()}
+        else:
+            convert = _value_to_json(field, kind, preserving_proto_field_name,
+                                     including_default_value_fields)
+            if repeated:
+                convert = _repeated(convert or _identity)
+        required = field.label == FieldDescriptor.LABEL_REQUIRED
+        plan.append((name, json_name, convert, default, required))
+
+    return _to_json_plans.setdefault(key, plan)
+
+
+_prototypes = {}
+
+
+def _prototype_to_json(cls, preserving_proto_field_name):
+    # fields set on the proxy class prototype, e.g. the name of Cpus; these
+    # are always emitted, like the fields set on a message
+    key = (cls, preserving_proto_field_name)
+    try:
+        return _prototypes[key]
+    except KeyError:
+        pass
+
+    prototype = getattr(cls, 'proto', None)
+    result = None
+    if isinstance(prototype, Message) and prototype.ListFields():
+        result = MessageToDict(
+            prototype,
+            preserving_proto_field_name=preserving_proto_field_name)
+    return _prototypes.setdefault(key, result)
+
+
+def _message_to_json(obj, descriptor, preserving_proto_field_name=False,
+                     including_default_value_fields=False, nested=False):
+    result = {}
+    if obj.__class__ not in _plain:
+        result.update(_prototype_to_json(obj.__class__,
+                                         preserving_proto_field_name) or {})
+    present = bool(result)  # sub-messages of defaults only are omitted
+    for name, json_name, convert, default, required in to_json_plan(
+            descriptor, preserving_proto_field_name,
+            including_default_value_fields):
+        value = obj.get(name)
+        if value is None:
+            continue
+        elif default is _KEEP or default is _EMPTY or value != default:
+            value = value if convert is None else convert(value)
+            if default is _EMPTY and not value:
+                continue
+            present = True
+        elif required:
+            value = value if convert is None else convert(value)
+        else:
+            continue
+        result[json_name] = value
+    return result if present or not nested else {}
+
+
+def _generic_to_json(obj):
+    # containers without descriptor, e.g. plain maps
+    if isinstance(obj, dict):
+        return {k: _generic_to_json(v) for k, v in obj.items()}
+    elif isinstance(obj, (list, tuple)):
+        return [_generic_to_json(v) for v in obj]
+    elif isinstance(obj, six.binary_type):
+        return _bytes_to_json(obj)
+    elif isinstance(obj, float):
+        return _float_to_json(obj)
+    return obj
+
+
+def _descriptor(obj):
+    proto = getattr(obj.__class__, 'proto', None)
+    return getattr(proto, 'DESCRIPTOR', None)
+
+
+def to_json(obj, descriptor=None, preserving_proto_field_name=False,
+            including_default_value_fields=False):
+    # converts a proxy tree to json compatible python objects
+    descriptor = descriptor or _descriptor(obj)
+    if descriptor is None:
+        return _generic_to_json(obj)
+    return _message_to_json(obj, descriptor, preserving_proto_field_name,
+                            including_default_value_fields)
+
+
+def _value_from_json(field, kind):
+    if kind == MESSAGE and field.message_type.full_name in WELL_KNOWN_TYPES:
+        return lambda pb, value: ParseDict(value, pb)
+    elif kind == MESSAGE:
+        descriptor = field.message_type
+        return lambda pb, value: _message_from_json(pb, value, descriptor)
+    elif kind == ENUM:
+        return _enum_from_json(field)
+    elif field.type in INT64_TYPES:
+        return _int_from_json
+    elif field.type in FLOAT_TYPES:
+        return _float_from_json
+    elif field.type == FieldDescriptor.TYPE_BYTES:
+        return _bytes_from_json
+    return None
+
+
+def from_json_plan(descriptor):
+    try:
+        return _from_json_plans[descriptor]
+    except KeyError:
+        pass
+
+    plan = {}
+    for name, field, kind, repeated, _ in field_plan(descriptor).values():
+        if kind == MAP:
+            key_field, value_field = field.message_type.fields
+            convert_key = _key_from_json(key_field) or _identity
+            value_kind = field_plan(field.message_type)['value'].kind
+            convert_value = _value_from_json(value_field, value_kind)
+
+            if value_kind == MESSAGE:
+                def setter(pb, items, name=name, convert_key=convert_key,
+                           convert_value=convert_value):
+                    container = getattr(pb, name)
+                    for k, v in items.items():
+                        convert_value(container[convert_key(k)], v)
+            else:
+                convert_value = convert_value or _identity
+
+                def setter(pb, items, name=name, convert_key=convert_key,
+                           convert_value=convert_value):
+                    getattr(pb, name).update(
+                        (convert_key(k), convert_value(v))
+                        for k, v in items.items())
+        elif kind == MESSAGE:
+            convert = _value_from_json(field, kind)
+            if repeated:
+                def setter(pb, values, name=name, convert=convert):
+                    container = getattr(pb, name)
+                    for value in values:
+                        convert(container.add(), value)
+            else:
+                def setter(pb, value, name=name, convert=convert):
+                    sub = getattr(pb, name)
+                    sub.SetInParent()
+                    convert(sub, value)
+        else:
+            convert = _value_from_json(field, kind) or _identity
+            if repeated:
+                def setter(pb, values, name=name, convert=convert):
+                    getattr(pb, name).extend(convert(v) for v in values)
+            else:
+                def setter(pb, value, name=name, convert=convert):
+                    setattr(pb, name, convert(value))
+        plan[name] = plan[field.json_name] = setter
+
+    return _from_json_plans.setdefault(descriptor, plan)
+
+
+def _message_from_json(pb, obj, descriptor):
+    plan = from_json_plan(descriptor)
+    for key, value in obj.items():
+        if value is None:
+            continue
+        try:
+            setter = plan[key]
+        except KeyError:
+            raise KeyError('{} has no field {}'.format(descriptor.full_name,
+                                                       key))
+        setter(pb, value)
+    return pb
+
+
+def from_json(obj, proto):
+    # converts json compatible python objects to a protobuf message
+    return _message_from_json(proto(), obj, proto.DESCRIPTOR)
+
+
+def dumps(obj, descriptor=None, preserving_proto_field_name=False,
+          indent=None, backend=None, including_default_value_fields=False):
+    tree = to_json(obj, descriptor, preserving_proto_field_name,
+                   including_default_value_fields)
+    backend = backend or ('orjson' if orjson and not indent else 'json')
+    if backend == 'orjson':
+        return orjson.dumps(tree).decode('utf-8')
+    return json.dumps(tree, indent=indent)
+
+
+def loads(data, proto, backend=None):
+    # produces typed proxies through the registry
+    backend = backend or ('orjson' if orjson else 'json')
+    tree = orjson.loads(data) if backend == 'orjson' else json.loads(data)
+    return decode(from_json(tree, proto))
@@ -0,0 +1,274 @@
+from __future__ import absolute_import, division, print_function
+
+import os
+import six
+import mmap
+import struct
+import hashlib
+
+from array import array
+from bisect import bisect_left, bisect_right
+from operator import attrgetter
+from google.protobuf.descriptor import FieldDescriptor
+
+from .messages import decode
+from .protobuf import REVERSE_TYPE_CALLABLE_MAP, enum_to_label, scalar_path
+from .stream import decode_varint, parse
+
+__all__ = ('MessageLog',
+           'FieldPath',
+           'FieldIndex')
+
+
+class FieldPath(object):
+    # extracts a scalar value addressed by a dotted path from a message
+
+    def __init__(self, descriptor, path):
+        self.path = path
+        self.field = scalar_path(descriptor, path)
+        self.getter = attrgetter(path)
+
+    def value(self, pb):
+        value = self.getter(pb)
+        if self.field.type == FieldDescriptor.TYPE_ENUM:
+            return enum_to_label(self.field, value)
+        return value
+
+    def coerce(self, value):
+        # criteria are converted to the field's type (e.g. 3 to 3.0 for
+        # doubles, numbers to labels for enums), indexes hash the string form
+        # of the values; None if no value of the field can be equal
+        try:
+            if self.field.type != FieldDescriptor.TYPE_ENUM:
+                return REVERSE_TYPE_CALLABLE_MAP[self.field.type](value)
+            elif isinstance(value, six.string_types):
+                return value
+            return enum_to_label(self.field, value)
+        except (KeyError, TypeError, ValueError):
+            return None
+
+
+def value_hash(value):
+    if not isinstance(value, six.binary_type):
+        value = six.text_type(value).encode('utf-8')
+    return struct.unpack('<Q', hashlib.md5(value).digest()[:8])[0]
+
+
+SAMPLES = 1024  # frame boundaries verified of a modified log's sidecar
+
+
+def prefix_hash(view, size, window=4096):
+    # identifies the first size bytes of a file by their tail, cheap enough to
+    # verify on every open; appends keep it, rewrites most likely change it,
+    # a heuristic only
+    start = max(size - window, 0)
+    return value_hash(struct.pack('<Q', size) + bytes(view[start:size]))
+
+
+class FieldIndex(FieldPath):
+    # on-disk hash index mapping values to record numbers, persisted as
+    # array('Q') of [indexed records, prefix hash of the indexed records, n,
+    # n sorted hashes, n record numbers]
+
+    def __init__(self, descriptor, path, index_path):
+        super(FieldIndex, self).__init__(descriptor, path)
+        self.index_path = index_path
+        self.count = 0
+        self.hashes = array('Q')
+        self.records = array('Q')
+        self.pending = []
+
+    def load(self, log):
+        data = array('Q')
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'rb') as fp:
+                data.frombytes(fp.read())
+        if (len(data) < 3 or data[0] > len(log) or
+                data[1] != prefix_hash(log.view, log.offsets[data[0]])):
+            return  # missing or stale, rebuild from scratch
+        n = data[2]
+        self.count = data[0]
+        self.hashes = data[3:3 + n]
+        self.records = data[3 + n:3 + 2 * n]
+
+    def add(self, record, pb):
+        self.pending.append((value_hash(self.value(pb)), record))
+        self.count = record + 1
+
+    def save(self, log):
+        if not self.pending:
+            return
+        pairs = sorted(list(zip(self.hashes, self.records)) + self.pending)
+        self.hashes = array('Q', (h for h, _ in pairs))
+        self.records = array('Q', (r for _, r in pairs))
+        self.pending = []
+        with open(self.index_path, 'wb') as fp:
+            checksum = prefix_hash(log.view, log.offsets[self.count])
+            array('Q', [self.count, checksum, len(pairs)]).tofile(fp)
+            self.hashes.tofile(fp)
+            self.records.tofile(fp)
+
+    def lookup(self, value):
+        key = value_hash(value)
+        lo = bisect_left(self.hashes, key)
+        hi = bisect_right(self.hashes, key, lo)
+        return set(self.records[lo:hi])
+
+
+class MessageLog(object):
+    # random access over a varint length-delimited file (as written by
+    # proxo.stream.write_delimited) through a memory map; frame offsets are
+    # kept in an array('Q') sidecar file of [mtime, prefix hash, offsets],
+    # whose last item is the indexed size; the sidecar of a modified log is
+    # extended if it passes a heuristic check of being appended to, and
+    # rebuilt otherwise; secondary indexes map values of scalar field paths
+    # to record numbers
+
+    def __init__(self, path, proto, index_path=None, reindex=False,
+                 indexes=()):
+        self.path = path
+        self.proto = proto
+        self.index_path = index_path or path + '.idx'
+
+        if not isinstance(indexes, dict):
+            indexes = {field: field for field in indexes}
+        self.indexes = {}
+        for name, field in indexes.items():
+            self.indexes[name] = FieldIndex(
+                proto.DESCRIPTOR, field, '{}.{}.idx'.format(path, name))
+
+        self.file = open(path, 'rb')
+        stat = os.fstat(self.file.fileno())
+        self.size, self.mtime = stat.st_size, stat.st_mtime_ns
+        if self.size:
+            self.mmap = mmap.mmap(self.file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        else:  # empty files cannot be mapped
+            self.mmap = b''
+        self.view = memoryview(self.mmap)
+        self.offsets = self._index(reindex)
+        self._build_indexes(reindex)
+
+    def _build_indexes(self, reindex=False):
+        indexes = self.indexes.values()
+        if not (reindex or self.rebuilt):  # stale along the offsets
+            for index in indexes:
+                index.load(self)
+        start = min([index.count for index in indexes] or [len(self)])
+        for i in range(start, len(self)):
+            pb = parse(self.proto, self.frame(i))
+            for index in indexes:
+                if index.count <= i:
+                    index.add(i, pb)
+        for index in indexes:
+            index.save(self)
+
+    def _index(self, reindex=False):
+        data = array('Q')
+        if not reindex and os.path.exists(self.index_path):
+            with open(self.index_path, 'rb') as fp:
+                data.frombytes(fp.read())
+
+        header, offsets = data[:2], data[2:]
+        self.rebuilt = not self._indexed(header, offsets)
+        if self.rebuilt:
+            header, offsets = array('Q', [0, 0]), array('Q', [0])
+        indexed = len(offsets)
+
+        # extend the index with frames appended since it was written
+        pos = offsets.pop()
+        while pos < self.size:
+            offsets.append(pos)
+            length, start = decode_varint(self.view, pos, self.size)
+            if length is None or start + length > self.size:
+                raise EOFError('Truncated frame at offset {}'.format(pos))
+            pos = start + length
+        offsets.append(pos)
+
+        if len(offsets) != indexed or header[0] != self.mtime:
+            header = array('Q', [self.mtime, prefix_hash(self.view, pos)])
+            with open(self.index_path, 'wb') as fp:
+                header.tofile(fp)
+                offsets.tofile(fp)
+        return offsets
+
+    def _indexed(self, header, offsets):
+        # whether the sidecar still describes a prefix of the log: trusted if
+        # the log wasn't modified since it was written, otherwise the prefix
+        # hash and the frame boundaries at up to SAMPLES offsets spread evenly
+        # (all of them in smaller logs) are verified; verifying every frame
+        # would cost as much as rebuilding the index
+        if len(header) < 2 or not offsets or offsets[-1] > self.size:
+            return False
+        if header[0] == self.mtime and offsets[-1] == self.size:
+            return True
+        if header[1] != prefix_hash(self.view, offsets[-1]):
+            return False
+
+        count = len(offsets) - 1
+        sampled = set(range(0, count, max(count // SAMPLES, 1)))
+        sampled.update([count - 1] if count else [])
+        for i in sampled:
+            length, start = decode_varint(self.view, offsets[i],
+                                          offsets[i + 1])
+            if length is None or start + length != offsets[i + 1]:
+                return False
+        return True
+
+    def frame(self, i):
+        # returns a memoryview of the i-th serialized message
+        length, start = decode_varint(self.view, self.offsets[i],
+                                      self.offsets[i + 1])
+        return self.view[start:start + length]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('MessageLog index out of range')
+        return decode(parse(self.proto, self.frame(i)))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield decode(parse(self.proto, self.frame(i)))
+
+    def find(self, **criteria):
+        # criteria are keyed by index name or by field path; only the
+        # records matched by the indexes are decoded
+        candidates, paths = None, []
+        for name, value in criteria.items():
+            if name in self.indexes:
+                index = self.indexes[name]
+            else:
+                index = FieldPath(self.proto.DESCRIPTOR, name)
+            value = index.coerce(value)
+            if value is None:
+                return
+            if name in self.indexes:
+                records = index.lookup(value)
+                candidates = (records if candidates is None
+                              else candidates & records)
+            paths.append((index, value))
+
+        records = range(len(self)) if candidates is None else sorted(candidates)
+        for i in records:
+            pb = parse(self.proto, self.frame(i))
+            if all(path.value(pb) == value for path, value in paths):
+                yield decode(pb)
+
+    def close(self):
+        self.view.release()
+        if self.size:
+            self.mmap.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,13 +1,101 @@
 from __future__ import absolute_import, division, print_function
 
+import threading
+
+from copy import deepcopy
+from collections import OrderedDict
 from six import with_metaclass
 from functools import partial
+from google.protobuf.descriptor import FieldDescriptor
 from google.protobuf.message import Message
 
-from .protobuf import dict_to_protobuf, protobuf_to_dict
+from .protobuf import ANY, dict_to_protobuf, protobuf_to_dict
+from .wellknown import Packed
+
+
+class Field(object):
+    # non-data descriptor reading a message field from the underlying dict,
+    # absent fields return the protobuf default instead of raising
+    __slots__ = ('name', 'default')
+
+    def __init__(self, name, default=None):
+        self.name = name
+        self.default = default
+
+    @classmethod
+    def from_descriptor(cls, field):
+        message = field.message_type
+        if field.label == FieldDescriptor.LABEL_REPEATED:
+            if message is not None and message.GetOptions().map_entry:
+                message = message.fields_by_name['value'].message_type
+                default = freeze(Map())
+            else:
+                default = ()
+        elif field.containing_oneof is not None:
+            default = None  # inactive oneof members are absent
+        elif field.type == FieldDescriptor.TYPE_MESSAGE:
+            default = None
+        elif field.type == FieldDescriptor.TYPE_ENUM:
+            default = field.enum_type.values_by_number[
+                field.default_value].name
+        else:
+            default = field.default_value
+        if message is not None and message.full_name == ANY:
+            cls = AnyField  # single, repeated and map values
+        return cls(field.name, default)
+
+    def __get__(self, obj, cls=None):
+        if obj is None:
+            return self
+        return obj.get(self.name, self.default)
+
+
+class AnyField(Field):
+    # resolves packed Any payloads on first access
+    __slots__ = ()
+
+    def __get__(self, obj, cls=None):
+        if obj is None:
+            return self
+        value = obj.get(self.name, self.default)
+        if is_packed(value):
+            value = unpack(obj, self.name, value)
+        return value
+
+
+def is_packed(value):
+    # single, repeated or map values of Any fields
+    if isinstance(value, (list, tuple)):
+        return bool(value) and isinstance(value[0], Packed)
+    elif isinstance(value, dict):
+        return bool(value) and isinstance(next(iter(value.values())), Packed)
+    return isinstance(value, Packed)
+
+
+def _resolve(value):
+    return decode(value.message()) if isinstance(value, Packed) else value
+
+
+def unpack(obj, k, value):
+    # replaces Any payloads by the proxies of the packed messages, frozen
+    # instances share the resolved values as well
+    if isinstance(value, (list, tuple)):
+        value = list(map(_resolve, value))
+    elif isinstance(value, dict):
+        resolved = Map()
+        for key, item in value.items():
+            resolved[key] = _resolve(item)
+        value = resolved
+    else:
+        value = decode(value.message())
+    if isinstance(obj, Frozen):
+        value = freeze(value)
+    dict.__setitem__(obj, k, value)
+    return value
 
 
 class Map(dict):
+    flyweights = None
 
     def __init__(self, **kwargs):
         for k, v in kwargs.items():
@@ -18,7 +106,11 @@ class Map(dict):
         if isinstance(v, Map):
             return v
         elif isinstance(v, dict):
-            return Map(**v)
+            # item assignment keeps the non-string keys of map fields
+            m = Map()
+            for key, value in v.items():
+                m[key] = value
+            return m
         # elif hasattr(v, '__iter__'):
         elif isinstance(v, (list, tuple)):
             return list(map(cls.cast, v))
@@ -32,16 +124,19 @@ class Map(dict):
         prop = getattr(self.__class__, k, None)
         if isinstance(prop, property):  # property binding
             prop.fset(self, v)
-        elif hasattr(v, '__call__'):  # method binding
+        elif callable(v):  # method binding
             self.__dict__[k] = v
         else:
             self[k] = v
 
     def __getattr__(self, k):
         try:
-            return self[k]
+            value = self[k]
         except KeyError:
-            raise AttributeError
+            raise AttributeError(k)
+        if is_packed(value):
+            value = unpack(self, k, value)
+        return value
 
     def __delattr__(self, k):
         del self[k]
@@ -50,13 +145,120 @@ class Map(dict):
         return hash(tuple(self.items()))
 
 
+class Frozen(object):
+    # mixin for the read-only instances shared by flyweight caches
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('{} is frozen'.format(self.__class__.__name__))
+
+    __setitem__ = __delitem__ = __setattr__ = __delattr__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __deepcopy__(self, memo):
+        return self  # immutable like tuples
+
+
+_frozen_classes = {}
+
+
+def frozen_class(cls):
+    try:
+        return _frozen_classes[cls]
+    except KeyError:
+        frozen = type(cls)('Frozen' + cls.__name__, (Frozen, cls),
+                           {'_thawed': cls})
+        return _frozen_classes.setdefault(cls, frozen)
+
+
+class FrozenList(list):
+    # read-only repeated fields, still equal to lists unlike tuples
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('{} is frozen'.format(self.__class__.__name__))
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = extend = insert = pop = remove = clear = _readonly
+    sort = reverse = _readonly
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def freeze(value):
+    if isinstance(value, (Frozen, FrozenList)):
+        return value
+    elif isinstance(value, dict):
+        cls = frozen_class(value.__class__)
+        frozen = cls.__new__(cls)
+        dict.update(frozen, ((k, freeze(v)) for k, v in value.items()))
+        return frozen
+    elif isinstance(value, (list, tuple)):
+        return FrozenList(map(freeze, value))
+    else:
+        return value
+
+
+class Flyweights(object):
+    # bounded LRU cache of frozen instances keyed by the serialized message,
+    # shared by the threads decoding in parallel
+
+    def __init__(self, size):
+        self.size = size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.cache)
+
+    def get(self, key):
+        with self.lock:
+            value = self.cache.get(key)
+            if value is not None:
+                self.cache.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        value = freeze(value)
+        with self.lock:
+            # an instance cached by another thread meanwhile is shared
+            value = self.cache.setdefault(key, value)
+            self.cache.move_to_end(key)
+            if len(self.cache) > self.size:
+                self.cache.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
+
+
 class RegisterProxies(type):
 
     def __init__(cls, name, bases, nmspc):
         super(RegisterProxies, cls).__init__(name, bases, nmspc)
+        if '_thawed' in nmspc:  # frozen, tracked variants share the registration
+            return
+        size = getattr(cls, 'flyweight', None)
+        cls.flyweights = Flyweights(size) if size else None
+
         if not hasattr(cls, 'registry'):
             cls.registry = []
         cls.registry.insert(0, (cls.proto, cls))
+
+        descriptor = getattr(cls.proto, 'DESCRIPTOR', None)
+        if descriptor is not None:
+            for field in descriptor.fields:
+                # don't shadow properties, methods or dict attributes
+                attr = getattr(cls, field.name, None)
+                if attr is not None and not isinstance(attr, Field):
+                    continue
+                setattr(cls, field.name, Field.from_descriptor(field))
         # cls.registry -= set(bases) # Remove base classes
 
     # Metamethods, called on class objects:
@@ -66,6 +268,42 @@ class RegisterProxies(type):
 
 class MessageProxy(with_metaclass(RegisterProxies, Map)):
     proto = Message
+    flyweight = None  # size of the opt-in interning cache used by decode
+
+    def __reduce_ex__(self, protocol):
+        # pickled as the serialized message, keys which aren't fields of the
+        # message are pickled along (only on the top level)
+        cls = getattr(self.__class__, '_thawed', self.__class__)
+        descriptor = getattr(cls.proto, 'DESCRIPTOR', None)
+        if descriptor is None:
+            return super(MessageProxy, self).__reduce_ex__(protocol)
+
+        data = encode(self).SerializePartialToString()
+        fields = descriptor.fields_by_name
+        extras = [(k, v) for k, v in self.items() if k not in fields]
+        return (_restore, (cls, data), None, None, iter(extras))
+
+    def __copy__(self):
+        new = self.__class__.__new__(self.__class__)
+        dict.update(new, self)
+        new.__dict__.update(self.__dict__)
+        return new
+
+    def __deepcopy__(self, memo):
+        # structural, unlike pickling no defaults are filled in
+        new = self.__class__.__new__(self.__class__)
+        memo[id(self)] = new
+        for k, v in self.items():
+            dict.__setitem__(new, k, deepcopy(v, memo))
+        new.__dict__.update(deepcopy(self.__dict__, memo))
+        return new
+
+
+def _restore(cls, data):
+    proto = cls.proto if isinstance(cls.proto, type) else type(cls.proto)
+    pb = proto()
+    pb.ParseFromString(data)
+    return protobuf_to_dict(pb, containers=[(proto, cls)] + cls.registry)
 
 
 decode = partial(protobuf_to_dict, containers=MessageProxy.registry)
@@ -0,0 +1,168 @@
+from __future__ import absolute_import, division, print_function
+
+import io
+import os
+import atexit
+import pickle
+import importlib
+import threading
+
+from array import array
+from collections import deque
+from itertools import chain, islice
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool, shared_memory
+from google.protobuf import symbol_database
+
+from .messages import Frozen, Map, decode, freeze
+from .stream import parse
+
+__all__ = ('decode_many',
+           'decode_threaded',
+           'shutdown')
+
+
+THRESHOLD = 1024  # smaller batches are decoded in the calling process
+
+_pools = {}  # (workers, modules) -> pool shared by decode_many calls
+_lock = threading.Lock()
+
+
+def _initialize(modules):
+    # import the modules defining the proxies, required by the spawn and
+    # forkserver start methods to populate the registry
+    for module in modules:
+        importlib.import_module(module)
+
+
+def _shared_pool(workers, modules):
+    key = workers, tuple(modules)
+    with _lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = Pool(workers, initializer=_initialize,
+                                      initargs=(modules,))
+        return pool
+
+
+@atexit.register
+def shutdown():
+    # terminates the worker pools shared by decode_many calls
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.terminate()
+        pool.join()
+
+
+def _rebuild(cls, items, state, frozen):
+    new = cls.__new__(cls)
+    dict.update(new, items)
+    new.__dict__.update(state)
+    return freeze(new) if frozen else new
+
+
+class _ResultPickler(pickle.Pickler):
+    # proxies are pickled structurally, the default reduction pickles the
+    # serialized message and decodes it again in the receiving process
+
+    def reducer_override(self, obj):
+        if not isinstance(obj, Map):
+            return NotImplemented
+        cls = getattr(obj.__class__, '_thawed', obj.__class__)
+        return (_rebuild, (cls, list(dict.items(obj)), obj.__dict__,
+                           isinstance(obj, Frozen)))
+
+
+def _dumps(results):
+    buffer = io.BytesIO()
+    _ResultPickler(buffer, pickle.HIGHEST_PROTOCOL).dump(results)
+    return buffer.getvalue()
+
+
+def _decode_chunk(task):
+    # message classes are resolved by full name, generated classes don't
+    # necessarily pickle by reference; the segment is detached at the end of
+    # each task, otherwise idle workers keep the unlinked memory mapped
+    name, full_name, offsets = task
+    proto = symbol_database.Default().GetSymbol(full_name)
+    segment = shared_memory.SharedMemory(name=name)
+    try:
+        view = segment.buf
+        try:
+            return _dumps([decode(parse(proto,
+                                        view[offsets[i]:offsets[i + 1]]))
+                           for i in range(len(offsets) - 1)])
+        finally:
+            del view
+    finally:
+        segment.close()
+
+
+def decode_many(buffers, proto, workers=None, chunksize=None, pool=None,
+                modules=(), threshold=THRESHOLD):
+    # without a pool the worker processes are started by the first call and
+    # shared by the later ones with the same workers and modules, until
+    # shutdown() or the interpreter exits; pass pool= to manage them instead
+    buffers = list(buffers)
+    if workers == 1 or len(buffers) < threshold:
+        return [decode(parse(proto, data)) for data in buffers]
+
+    offsets = array('Q', [0])
+    for data in buffers:
+        offsets.append(offsets[-1] + len(data))
+
+    segment = shared_memory.SharedMemory(create=True,
+                                         size=max(offsets[-1], 1))
+    try:
+        for data, start, stop in zip(buffers, offsets, offsets[1:]):
+            segment.buf[start:stop] = data
+
+        if pool is None:
+            pool = _shared_pool(workers, modules)
+        if chunksize is None:
+            processes = workers or os.cpu_count() or 1
+            chunksize = -(-len(buffers) // (4 * processes))
+        full_name = proto.DESCRIPTOR.full_name
+        tasks = [(segment.name, full_name, offsets[i:i + chunksize + 1])
+                 for i in range(0, len(buffers), chunksize)]
+        results = pool.map(_decode_chunk, tasks)
+    finally:
+        segment.close()
+        segment.unlink()
+
+    return list(chain.from_iterable(map(pickle.loads, results)))
+
+
+def _parse_chunk(proto, chunk):
+    return [parse(proto, data) for data in chunk]
+
+
+def decode_threaded(buffers, proto, threads=None, chunksize=64, window=None,
+                    executor=None):
+    # pipelined decode: chunks of buffers are parsed on a thread pool (the
+    # C++ and upb backends parse without holding the GIL) while the calling
+    # thread converts the parsed messages into proxies in order
+    owned = executor is None
+    if owned:
+        executor = ThreadPoolExecutor(threads or os.cpu_count() or 1)
+    window = window or 2 * (threads or os.cpu_count() or 1)
+
+    buffers, pending = iter(buffers), deque()
+    try:
+        while True:
+            while len(pending) < window:
+                chunk = list(islice(buffers, chunksize))
+                if not chunk:
+                    break
+                pending.append(executor.submit(_parse_chunk, proto, chunk))
+            if not pending:
+                return
+            for pb in pending.popleft().result():
+                yield decode(pb)
+    finally:
+        for future in pending:
+            future.cancel()
+        if owned:
+            executor.shutdown(wait=False)
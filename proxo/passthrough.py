@@ -0,0 +1,157 @@
+from __future__ import absolute_import, division, print_function
+
+from .messages import MessageProxy, decode as decode_proxy, freeze
+from .patch import equal
+from .protobuf import dict_to_protobuf
+from .wellknown import Packed
+from .wire import strip_fields
+
+__all__ = ('Tracked',
+           'tracked_class',
+           'decode',
+           'encode',
+           'splice')
+
+
+MUTABLE = (dict, list, Packed)  # values which can be changed in place
+_missing = object()
+
+
+class Tracked(object):
+    # mixin recording the fields assigned, deleted or handed out as mutable
+    # values since decoding, only those are serialized again by splice;
+    # touched are the fields
+    #   - assigned, deleted, popped or set by update and setdefault
+    #   - read by item or attribute access or get, if the value is a
+    #     message, repeated field, map or Any
+    #   - holding such values when items() or values() is called
+    # iterating over the keys touches nothing; changes made through views
+    # taken without these methods (e.g. dict(proxy) or dict.items) aren't
+    # recorded and are lost; a frozen snapshot of each field is kept on the
+    # first touch, fields still equal to it are copied from the original
+    # buffer by splice, so reading costs nothing
+
+    def _touch(self, k, value=_missing):
+        touched = self.__dict__.setdefault('_touched', {})
+        if k not in touched:
+            if value is _missing:
+                value = dict.get(self, k, _missing)
+            touched[k] = freeze(value)
+
+    def _touch_mutable(self):
+        for k, v in dict.items(self):
+            if isinstance(v, MUTABLE):
+                self._touch(k)
+
+    def __getitem__(self, k):
+        value = super(Tracked, self).__getitem__(k)
+        if isinstance(value, MUTABLE):
+            self._touch(k)
+        return value
+
+    def get(self, k, default=None):
+        value = super(Tracked, self).get(k, default)
+        if isinstance(value, MUTABLE) and k in self:
+            self._touch(k)
+        return value
+
+    def items(self):
+        self._touch_mutable()
+        return super(Tracked, self).items()
+
+    def values(self):
+        self._touch_mutable()
+        return super(Tracked, self).values()
+
+    def __setitem__(self, k, v):
+        self._touch(k)
+        super(Tracked, self).__setitem__(k, v)
+
+    def __delitem__(self, k):
+        self._touch(k)
+        super(Tracked, self).__delitem__(k)
+
+    def pop(self, k, *args):
+        self._touch(k)
+        return super(Tracked, self).pop(k, *args)
+
+    def popitem(self):
+        item = super(Tracked, self).popitem()
+        self._touch(*item)
+        return item
+
+    def setdefault(self, k, default=None):
+        self._touch(k)
+        return super(Tracked, self).setdefault(k, default)
+
+    def update(self, *args, **kwargs):
+        for k, v in dict(*args, **kwargs).items():
+            self[k] = v
+
+    def clear(self):
+        for k in self:
+            self._touch(k)
+        super(Tracked, self).clear()
+
+    def __copy__(self):
+        new = super(Tracked, self).__copy__()
+        new.__dict__['_touched'] = dict(self.__dict__.get('_touched', {}))
+        return new
+
+
+_tracked_classes = {}
+
+
+def tracked_class(cls):
+    cls = getattr(cls, '_thawed', cls)
+    try:
+        return _tracked_classes[cls]
+    except KeyError:
+        tracked = type(cls)('Tracked' + cls.__name__, (Tracked, cls),
+                            {'_thawed': cls})
+        return _tracked_classes.setdefault(cls, tracked)
+
+
+def decode(data, proto):
+    # decodes a proxy which keeps the serialized message, including the
+    # fields unknown to proto
+    data = bytes(data)
+    pb = proto()
+    pb.ParseFromString(data)
+    proxy = decode_proxy(pb)
+
+    cls = tracked_class(proxy.__class__)
+    tracked = cls.__new__(cls)
+    dict.update(tracked, proxy)
+    tracked.__dict__.update(proxy.__dict__)
+    tracked.__dict__.update(_raw=data, _proto=proto, _touched={})
+    return tracked
+
+
+def splice(proxy):
+    # unchanged fields are copied from the original buffer at the wire
+    # level, changed ones are stripped from it and serialized again
+    raw, proto = proxy.__dict__['_raw'], proxy.__dict__['_proto']
+    fields = proto.DESCRIPTOR.fields_by_name
+    touched = [k for k, original in proxy.__dict__['_touched'].items()
+               if k in fields and
+               not equal(dict.get(proxy, k, _missing), original)]
+    if not touched:
+        return raw
+
+    changes = {}
+    for k in touched:
+        value = dict.get(proxy, k)
+        if value is not None:
+            changes[k] = value
+    pb = dict_to_protobuf(changes, proto(), containers=MessageProxy.registry,
+                          strict=False)
+
+    numbers = {fields[k].number for k in touched}
+    return strip_fields(raw, numbers) + pb.SerializePartialToString()
+
+
+def encode(proxy):
+    pb = proxy.__dict__['_proto']()
+    pb.ParseFromString(splice(proxy))
+    return pb
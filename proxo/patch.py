@@ -0,0 +1,243 @@
+from __future__ import absolute_import, division, print_function
+
+from google.protobuf.field_mask_pb2 import FieldMask
+from google.protobuf.message import Message
+from google.protobuf.descriptor import FieldDescriptor
+
+from .messages import Frozen, Map, MessageProxy, _resolve, decode
+from .protobuf import (MESSAGE, TYPE_CALLABLE_MAP, dict_to_protobuf,
+                       field_plan, has_presence, resolve_path)
+from .wellknown import Packed
+
+__all__ = ('diff',
+           'apply_patch',
+           'field_mask',
+           'partial_message',
+           'REMOVED')
+
+
+class Removed(object):
+    __slots__ = ()
+
+    def __repr__(self):
+        return 'REMOVED'
+
+    def __reduce__(self):
+        return 'REMOVED'  # unpickled as the module level singleton
+
+
+REMOVED = Removed()  # patch value of the fields absent from the new tree
+
+_missing = object()
+
+
+def _descriptor(obj):
+    proto = getattr(obj.__class__, 'proto', None)
+    return getattr(proto, 'DESCRIPTOR', None)
+
+
+_nested_plans = {}
+
+
+def nested_plan(descriptor):
+    # message fields which are compared field by field, repeated fields, maps
+    # and well-known types are replaced as a whole like in a FieldMask
+    try:
+        return _nested_plans[descriptor]
+    except KeyError:
+        pass
+
+    nested = {}
+    for name, field, kind, repeated, _ in field_plan(descriptor).values():
+        if (kind == MESSAGE and not repeated and
+                field.message_type.full_name not in TYPE_CALLABLE_MAP):
+            nested[name] = field.message_type
+    return _nested_plans.setdefault(descriptor, nested)
+
+
+def equal(a, b):
+    # structural equality, proxies may override comparison (e.g. scalar
+    # resources compare their values only) so nested dicts are walked; the
+    # prototypes are compared too, they carry defaults like resource names
+    if a is b:
+        return True
+    if isinstance(a, Packed) != isinstance(b, Packed):
+        # Any payloads are resolved lazily, only on one side maybe
+        a, b = _resolve(a), _resolve(b)
+    if isinstance(a, dict) and isinstance(b, dict):
+        if len(a) != len(b) or (getattr(a.__class__, 'proto', None) !=
+                                getattr(b.__class__, 'proto', None)):
+            return False
+        for k, v in dict.items(a):
+            other = dict.get(b, k, _missing)
+            if other is _missing or not equal(v, other):
+                return False
+        return True
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(map(equal, a, b))
+    return a == b
+
+
+def _diff(a, b, descriptor, prefix, patch):
+    if descriptor is None:  # plain maps
+        nested, names = None, list(a) + [k for k in b if k not in a]
+    else:
+        nested, names = nested_plan(descriptor), field_plan(descriptor)
+
+    for name in names:
+        # plain dict access, tracked proxies shouldn't record reads
+        old, new = dict.get(a, name, _missing), dict.get(b, name, _missing)
+        if old is new:
+            continue  # identical subtree, e.g. a shared flyweight
+        path = prefix + name
+        if new is _missing:
+            patch[path] = REMOVED
+        elif old is _missing:
+            patch[path] = new
+        elif (isinstance(old, dict) and isinstance(new, dict) and
+              (nested is None or name in nested)):
+            if not equal(old, new):
+                _diff(old, new, nested and nested[name], path + '.', patch)
+        elif not equal(old, new):
+            patch[path] = new
+
+
+def diff(a, b, descriptor=None):
+    # changed field paths of b relative to a mapped to their new values
+    if isinstance(a, Message):
+        a = decode(a)
+    if isinstance(b, Message):
+        b = decode(b)
+
+    patch = {}
+    if not equal(a, b):
+        descriptor = descriptor or _descriptor(b) or _descriptor(a)
+        _diff(a, b, descriptor, '', patch)
+    return patch
+
+
+def field_mask(patch):
+    return FieldMask(paths=sorted(patch))
+
+
+def partial_message(patch, proto):
+    # message carrying the new values, merged along field_mask(patch) the
+    # removed fields are cleared
+    pb = proto()
+    for path, value in patch.items():
+        if value is REMOVED:
+            continue
+        fields = resolve_path(pb.DESCRIPTOR, path)
+        parent = pb
+        for field in fields[:-1]:
+            parent = getattr(parent, field.name)
+        parent.SetInParent()
+        dict_to_protobuf({fields[-1].name: value}, parent,
+                         containers=MessageProxy.registry)
+    return pb
+
+
+def _leaf_value(parent, field):
+    # converts a single field through a message holding only that field
+    holder = parent.__class__()
+    if field.label == FieldDescriptor.LABEL_REPEATED:
+        getattr(holder, field.name).MergeFrom(getattr(parent, field.name))
+    elif field.type == FieldDescriptor.TYPE_MESSAGE:
+        getattr(holder, field.name).CopyFrom(getattr(parent, field.name))
+    else:
+        setattr(holder, field.name, getattr(parent, field.name))
+    return decode(holder)[field.name]
+
+
+def mask_to_patch(mask, message):
+    # paths absent from message are removed, like FieldMask merges do
+    patch = {}
+    for path in mask.paths:
+        fields = resolve_path(message.DESCRIPTOR, path)
+        parent = message
+        for field in fields[:-1]:
+            if not parent.HasField(field.name):
+                parent = None
+                break
+            parent = getattr(parent, field.name)
+
+        leaf = fields[-1]
+        if parent is None or (has_presence(leaf) and
+                              not parent.HasField(leaf.name)):
+            patch[path] = REMOVED
+        else:
+            patch[path] = _leaf_value(parent, leaf)
+    return patch
+
+
+def _apply_message(pb, path, value, repeated):
+    fields = resolve_path(pb.DESCRIPTOR, path)
+    parent = pb
+    for field in fields[:-1]:
+        parent = getattr(parent, field.name)
+    leaf = fields[-1]
+
+    if value is REMOVED or value is None:
+        parent.ClearField(leaf.name)
+        return
+    parent.SetInParent()
+    if leaf.label == FieldDescriptor.LABEL_REPEATED:
+        if repeated == 'replace':
+            parent.ClearField(leaf.name)
+    elif leaf.type == FieldDescriptor.TYPE_MESSAGE:
+        parent.ClearField(leaf.name)  # sub-messages are replaced
+    dict_to_protobuf({leaf.name: value}, parent,
+                     containers=MessageProxy.registry)
+
+
+def _child(parent, name):
+    # writable sub-map, created if absent and thawed if shared
+    child = parent.get(name)
+    if not isinstance(child, dict):
+        child = Map()
+    elif isinstance(child, Frozen):
+        thawed = child._thawed.__new__(child._thawed)
+        dict.update(thawed, child)
+        child = thawed
+    else:
+        return child
+    parent[name] = child
+    return child
+
+
+def _apply_proxy(proxy, path, value, repeated):
+    names = path.split('.')
+    parent = proxy
+    for name in names[:-1]:
+        parent = _child(parent, name)
+    name = names[-1]
+
+    if value is REMOVED:
+        parent.pop(name, None)
+    elif repeated == 'append' and isinstance(value, dict):
+        merged = dict(parent.get(name) or {})
+        merged.update(value)
+        parent[name] = merged
+    elif repeated == 'append' and isinstance(value, (list, tuple)):
+        parent[name] = list(parent.get(name) or ()) + list(value)
+    elif isinstance(value, (list, tuple)):
+        parent[name] = list(value)
+    else:
+        parent[name] = value
+
+
+def apply_patch(target, patch, message=None, repeated='replace'):
+    # applies a path patch or a FieldMask with the message carrying the new
+    # values in place, only the addressed fields are touched; repeated fields
+    # and maps are either replaced or appended to (merged by key)
+    if repeated not in ('replace', 'append'):
+        raise ValueError('repeated must be either replace or append')
+    if isinstance(patch, FieldMask):
+        if message is None:
+            raise ValueError('FieldMask patches require a message')
+        patch = mask_to_patch(patch, message)
+
+    apply = _apply_message if isinstance(target, Message) else _apply_proxy
+    for path in sorted(patch):  # parents before their fields
+        apply(target, path, patch[path], repeated)
+    return target
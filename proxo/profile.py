@@ -0,0 +1,218 @@
+from __future__ import absolute_import, division, print_function
+
+import sys
+import threading
+import tracemalloc
+from collections import namedtuple
+from contextlib import contextmanager
+
+from google.protobuf.descriptor import FieldDescriptor
+
+from . import protobuf
+
+__all__ = ('Allocation',
+           'AllocationProfile',
+           'allocations')
+
+
+traced = tracemalloc.get_traced_memory
+
+
+class Allocation(namedtuple('Allocation', ['direction', 'type', 'path',
+                                           'count', 'size', 'objects'])):
+    __slots__ = ()
+
+
+class Frame(object):
+    # a message being converted, sizes exclude the profiler's own allocations
+    __slots__ = ('obj', 'caller', 'names', 'start', 'overhead', 'children',
+                 'index', 'records')
+
+    def __init__(self, obj, caller, names, start, overhead):
+        self.obj = obj
+        self.caller = caller  # python frame of the converting function
+        self.names = names  # field names from the root
+        self.start = start
+        self.overhead = overhead
+        self.children = 0  # bytes retained by the nested messages
+        self.index = None  # id of the nested values -> field name
+        self.records = {}  # of the nested messages, kept by the root
+
+
+def _dict_index(dct):
+    # direct values first, then the values of maps and repeated fields
+    index = {id(v): k for k, v in dct.items()}
+    for k, v in dct.items():
+        values = v.values() if isinstance(v, dict) else v
+        if isinstance(v, (dict, list, tuple)):
+            for item in values:
+                index.setdefault(id(item), k)
+    return index
+
+
+def _message_index(pb):
+    index = {}
+    for field, value in pb.ListFields():
+        if field.type != FieldDescriptor.TYPE_MESSAGE:
+            continue
+        if field.label != FieldDescriptor.LABEL_REPEATED:
+            index[id(value)] = field.name
+        else:
+            values = value.values() if hasattr(value, 'values') else value
+            for item in values:
+                index[id(item)] = field.name
+    return index
+
+
+def _field_name(parent, child):
+    if parent.index is None:
+        if isinstance(parent.obj, dict):
+            parent.index = _dict_index(parent.obj)
+        else:
+            parent.index = _message_index(parent.obj)
+    name = parent.index.get(id(child))
+    if name is None:  # backends creating new wrappers on access
+        parent, child = (getattr(parent.obj, 'DESCRIPTOR', None),
+                         getattr(child, 'DESCRIPTOR', None))
+        names = [f.name for f in getattr(parent, 'fields', ())
+                 if child is not None and f.message_type is child]
+        name = names[0] if len(names) == 1 else '?'
+    return name
+
+
+def _decoded_objects(result):
+    # the container and the values stored in it, nested messages are counted
+    # on their own
+    objects = 1
+    for value in result.values():
+        if isinstance(value, dict) and not type(value) is dict:
+            continue  # proxy of a nested message
+        if isinstance(value, (list, tuple, dict)):
+            items = value.values() if isinstance(value, dict) else value
+            objects += 1 + sum(1 for item in items
+                               if not isinstance(item, dict))
+        else:
+            objects += 1
+    return objects
+
+
+def _encoded_objects(pb):
+    objects = 1
+    for field, value in pb.ListFields():
+        if field.label == FieldDescriptor.LABEL_REPEATED:
+            objects += 1
+            if field.type != FieldDescriptor.TYPE_MESSAGE:
+                objects += len(value)
+        elif field.type != FieldDescriptor.TYPE_MESSAGE:
+            objects += 1
+    return objects
+
+
+class AllocationProfile(object):
+    # memory retained by the conversions attributed to the message type and
+    # the field path from the converted root, excluding the nested messages;
+    # meant for single threaded runs, the traced memory is process wide
+
+    def __init__(self):
+        self.records = {}  # (direction, type, path) -> [count, size, objects]
+        self.overhead = 0
+        self.local = threading.local()
+
+    @property
+    def stack(self):
+        try:
+            return self.local.stack
+        except AttributeError:
+            self.local.stack = []
+            return self.local.stack
+
+    def enter(self, obj):
+        now = traced()[0]
+        stack, caller = self.stack, sys._getframe(1)
+        if stack:
+            self._unwind(stack, caller)
+        if stack:
+            parent = stack[-1]
+            names = parent.names + (_field_name(parent, obj),)
+        else:
+            names = ()
+        stack.append(Frame(obj, caller, names, now, self.overhead))
+        self.overhead += traced()[0] - now
+        return stack[-1]
+
+    def _unwind(self, stack, caller):
+        # drops the frames of conversions that raised, their functions are no
+        # longer running; the new conversion is nested in the remaining ones
+        running, current = set(), caller.f_back
+        while current is not None:
+            running.add(id(current))
+            current = current.f_back
+        while stack and id(stack[-1].caller) not in running:
+            stack.pop()
+
+    def _exit(self, direction, frame, pb, objects):
+        now = traced()[0]
+        size = now - frame.start - (self.overhead - frame.overhead)
+        stack = self.stack
+        while stack.pop() is not frame:
+            pass  # nested conversions that raised and were handled
+
+        # the type of the root is known after it's converted only (encode)
+        root = stack[0] if stack else frame
+        name = pb.DESCRIPTOR.full_name
+        record = root.records.setdefault((name, frame.names), [0, 0, 0])
+        record[0] += 1
+        record[1] += size - frame.children
+        record[2] += objects
+
+        if stack:
+            stack[-1].children += size
+        else:
+            for (name, names), values in frame.records.items():
+                path = '.'.join((pb.DESCRIPTOR.full_name,) + names)
+                record = self.records.setdefault((direction, name, path),
+                                                 [0, 0, 0])
+                for i, value in enumerate(values):
+                    record[i] += value
+        self.overhead += traced()[0] - now
+
+    def decoded(self, frame, pb, result):
+        self._exit('decode', frame, pb, _decoded_objects(result))
+
+    def encoded(self, frame, dct, pb, matched):
+        self._exit('encode', frame, pb, _encoded_objects(pb))
+
+    def report(self, limit=None):
+        rows = [Allocation(direction, name, path, count, size, objects)
+                for (direction, name, path), (count, size, objects)
+                in self.records.items()]
+        rows.sort(key=lambda row: (-row.size, -row.objects, row.path))
+        return rows[:limit]
+
+    def format(self, limit=None):
+        lines = ['{:<8} {:>10} {:>10} {:>8}  {}'.format(
+            'dir', 'bytes', 'objects', 'count', 'path (type)')]
+        for row in self.report(limit):
+            lines.append('{:<8} {:>10} {:>10} {:>8}  {} ({})'.format(
+                row.direction, row.size, row.objects, row.count, row.path,
+                row.type))
+        return '\n'.join(lines)
+
+
+@contextmanager
+def allocations():
+    # with allocations() as profile:
+    #     decode(pb)
+    # print(profile.format(limit=20))
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    previous, profile = protobuf.tracer, AllocationProfile()
+    protobuf.tracer = profile
+    try:
+        yield profile
+    finally:
+        protobuf.tracer = previous
+        profile.local.stack = []  # frames of a conversion that raised
+        if started:
+            tracemalloc.stop()
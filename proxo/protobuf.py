@@ -3,21 +3,55 @@ from __future__ import absolute_import, division, print_function
 # import base64
 from copy import copy
 from functools import partial
+from collections import OrderedDict, namedtuple
 
 import six
 from google.protobuf.descriptor import FieldDescriptor
 from google.protobuf.message import Message
 
+from .wellknown import WELL_KNOWN_TYPES, REVERSE_WELL_KNOWN_TYPES
+
 __all__ = ('protobuf_to_dict',
            'dict_to_protobuf',
-           'TYPE_CALLABLE_MAP', 
+           'field_plan',
+           'oneof_plan',
+           'map_plan',
+           'decode_plan',
+           'encode_plan',
+           'Converters',
+           'TYPE_CALLABLE_MAP',
            'REVERSE_TYPE_CALLABLE_MAP')
 
 
 # adapted from https://github.com/benhodgson/protobuf-to-dict
 
 
-REVERSE_TYPE_CALLABLE_MAP = {
+class Converters(dict):
+    # converters mapping counting its changes, the plans compiled from it are
+    # rebuilt after it's changed
+
+    version = 0
+
+    def _changed(method):
+        def change(self, *args, **kwargs):
+            self.version += 1
+            return method(self, *args, **kwargs)
+        return change
+
+    __setitem__ = _changed(dict.__setitem__)
+    __delitem__ = _changed(dict.__delitem__)
+    clear = _changed(dict.clear)
+    pop = _changed(dict.pop)
+    popitem = _changed(dict.popitem)
+    setdefault = _changed(dict.setdefault)
+    update = _changed(dict.update)
+    del _changed
+
+    def copy(self):
+        return Converters(self)
+
+
+REVERSE_TYPE_CALLABLE_MAP = Converters({
     FieldDescriptor.TYPE_DOUBLE: float,
     FieldDescriptor.TYPE_FLOAT: float,
     FieldDescriptor.TYPE_INT32: int,
@@ -33,10 +67,158 @@ REVERSE_TYPE_CALLABLE_MAP = {
     FieldDescriptor.TYPE_BOOL: bool,
     FieldDescriptor.TYPE_STRING: six.text_type,
     FieldDescriptor.TYPE_BYTES: six.binary_type  # base64.b64encode,
-}
+})
 TYPE_CALLABLE_MAP = copy(REVERSE_TYPE_CALLABLE_MAP)
 TYPE_CALLABLE_MAP[FieldDescriptor.TYPE_ENUM] = int
+TYPE_CALLABLE_MAP.update(WELL_KNOWN_TYPES)
+REVERSE_TYPE_CALLABLE_MAP.update(REVERSE_WELL_KNOWN_TYPES)
 CONTAINER_MAP = []
+ANY = 'google.protobuf.Any'
+
+# set by proxo.instrument, notified of every message converted; a single
+# global check per message while disabled
+tracer = None
+
+
+SCALAR, ENUM, MESSAGE, MAP = range(4)
+
+
+class FieldPlan(namedtuple('FieldPlan', ['name', 'field', 'kind',
+                                         'repeated', 'oneof'])):
+    __slots__ = ()
+
+
+_plans = {}
+_oneof_plans = {}
+
+
+def field_plan(descriptor):
+    # per descriptor cache of the field kinds, ordered by field declaration
+    try:
+        return _plans[descriptor]
+    except KeyError:
+        pass
+
+    plan = OrderedDict()
+    for field in descriptor.fields:
+        if (field.message_type and field.message_type.has_options and
+                field.message_type.GetOptions().map_entry):
+            kind = MAP
+        elif field.type == FieldDescriptor.TYPE_MESSAGE:
+            kind = MESSAGE
+        elif field.type == FieldDescriptor.TYPE_ENUM:
+            kind = ENUM
+        else:
+            kind = SCALAR
+        repeated = field.label == FieldDescriptor.LABEL_REPEATED
+        oneof = field.containing_oneof
+        plan[field.name] = FieldPlan(field.name, field, kind, repeated,
+                                     oneof and oneof.name)
+
+    return _plans.setdefault(descriptor, plan)
+
+
+def oneof_plan(descriptor):
+    # fields outside of oneof groups and the names of the oneof groups
+    try:
+        return _oneof_plans[descriptor]
+    except KeyError:
+        pass
+
+    plan = field_plan(descriptor)
+    fields = tuple(p for p in plan.values() if p.oneof is None)
+    oneofs = tuple(oneof.name for oneof in descriptor.oneofs)
+    return _oneof_plans.setdefault(descriptor, (fields, oneofs))
+
+
+def map_plan(field):
+    # key and value plans of a map field's entry message
+    plan = field_plan(field.message_type)
+    return plan['key'], plan['value']
+
+
+_converter_plans = {}
+MAX_CONVERTER_PLANS = 1024
+
+
+def _converter_plan(build, descriptor, converters):
+    # plans are cached per descriptor and converters mapping, which is kept
+    # referenced so its id can't be reused; changes to Converters mappings
+    # (like TYPE_CALLABLE_MAP) rebuild the plans, changes to plain dicts
+    # already used for conversions are not picked up, build them once
+    key = build, descriptor, id(converters)
+    version = getattr(converters, 'version', None)
+    try:
+        _, cached, plan = _converter_plans[key]
+        if cached == version:
+            return plan
+    except KeyError:
+        pass
+
+    if len(_converter_plans) >= MAX_CONVERTER_PLANS:
+        _converter_plans.clear()  # e.g. a new mapping for every call
+    plan = build(descriptor, converters)
+    _converter_plans[key] = converters, version, plan
+    return plan
+
+
+class DecodePlan(namedtuple('DecodePlan', ['name', 'convert', 'mapping',
+                                           'repeated', 'optional'])):
+    __slots__ = ()
+
+
+def _build_decode_plan(descriptor, converters):
+    plan = OrderedDict()
+    for name, field, kind, repeated, _ in field_plan(descriptor).values():
+        mapping, optional = kind == MAP, False
+        if mapping:
+            # keys are always scalars, values are converted like fields
+            _, field, kind, _, _ = map_plan(field)[1]
+        if kind == MESSAGE:
+            # well-known types are converted by full name, the others are
+            # converted recursively (None)
+            convert = converters.get(field.message_type.full_name)
+            optional = convert is not None and not repeated
+        elif kind == ENUM:
+            convert = partial(enum_to_label, field)
+        else:
+            convert = converters[field.type]
+        plan[name] = DecodePlan(name, convert, mapping, repeated, optional)
+
+    fields, oneofs = oneof_plan(descriptor)
+    return tuple(plan[p.name] for p in fields), oneofs, plan
+
+
+def decode_plan(descriptor, converters=TYPE_CALLABLE_MAP):
+    # converters of the fields outside of oneof groups, the names of the
+    # oneof groups and the converters of all fields by name
+    return _converter_plan(_build_decode_plan, descriptor, converters)
+
+
+def _build_encode_plan(descriptor, converters):
+    # converters of the well-known message and map values by field name, and
+    # whether the values are packed into Any
+    plan = {}
+    for name, field, kind, _, _ in field_plan(descriptor).values():
+        if kind == MAP:
+            _, field, kind, _, _ = map_plan(field)[1]
+        if kind == MESSAGE:
+            full_name = field.message_type.full_name
+            convert = converters.get(full_name)
+            if convert is not None:
+                plan[name] = convert, full_name == ANY
+    return plan
+
+
+def encode_plan(descriptor, converters=REVERSE_TYPE_CALLABLE_MAP):
+    return _converter_plan(_build_encode_plan, descriptor, converters)
+
+
+def has_presence(field):
+    return (field.label != FieldDescriptor.LABEL_REPEATED and
+            (field.type == FieldDescriptor.TYPE_MESSAGE or
+             field.containing_oneof is not None or
+             field.containing_type.syntax == 'proto2'))
 
 
 def enum_to_label(field, value):
@@ -69,63 +251,162 @@ def container_to_message(container, containers):
                 return copy(msg)
 
 
+def resolve_path(descriptor, path):
+    # dotted field path to the list of field descriptors along it
+    fields = []
+    for name in path.split('.'):
+        if descriptor is None:
+            raise KeyError('{} is not a message field'.format(fields[-1].name))
+        field = descriptor.fields_by_name[name]
+        descriptor = field.message_type
+        fields.append(field)
+    return fields
+
+
+def scalar_path(descriptor, path):
+    # resolves a path to a non-repeated scalar field, returns its descriptor
+    fields = resolve_path(descriptor, path)
+    if any(f.label == FieldDescriptor.LABEL_REPEATED for f in fields):
+        raise ValueError('{} is a repeated field'.format(path))
+    if fields[-1].type == FieldDescriptor.TYPE_MESSAGE:
+        raise ValueError('{} is not a scalar field'.format(path))
+    return fields[-1]
+
+
 def protobuf_to_dict(pb, containers=CONTAINER_MAP, converters=TYPE_CALLABLE_MAP):
+    trace = tracer
+    if trace is not None:
+        token = trace.enter(pb)
+
     result = message_to_container(pb, containers)
+    flyweights = getattr(result, 'flyweights', None)
+    if flyweights is not None:
+        key = pb.SerializePartialToString(deterministic=True)
+        shared = flyweights.get(key)
+        if shared is not None:
+            if trace is not None:
+                trace.decoded(token, pb, shared)
+            return shared
+
+    # recursively encode protobuf sub-messages
+    message = partial(protobuf_to_dict, containers=containers,
+                      converters=converters)
 
     # for field, value in pb.ListFields():  # only non-empty fields
-    for field in pb.DESCRIPTOR.fields:  # empty fields too
-        value = getattr(pb, field.name)
-        if (field.message_type and field.message_type.has_options and
-                field.message_type.GetOptions().map_entry):
-            converter = dict
-        elif field.type == FieldDescriptor.TYPE_MESSAGE:
-            # recursively encode protobuf sub-message
-            converter = partial(protobuf_to_dict, containers=containers,
-                                converters=converters)
-        elif field.type == FieldDescriptor.TYPE_ENUM:
-            converter = partial(enum_to_label, field)
-        else:
-            converter = converters[field.type]
+    fields, oneofs, plan = decode_plan(pb.DESCRIPTOR, converters)
+    if oneofs:
+        # only the active member of each oneof group is converted
+        active = (pb.WhichOneof(oneof) for oneof in oneofs)
+        fields = fields + tuple(plan[name] for name in active if name)
+
+    for name, converter, mapping, repeated, optional in fields:
+        if converter is None:
+            converter = message
+        elif optional and not pb.HasField(name):
+            continue  # unset well-known types are absent
+        value = getattr(pb, name)  # empty fields too
 
-        if field.label == FieldDescriptor.LABEL_REPEATED:
-            result[field.name] = list(map(converter, value))
+        if mapping:
+            result[name] = {k: converter(v) for k, v in value.items()}
+        elif repeated:
+            result[name] = list(map(converter, value))
         else:
-            result[field.name] = converter(value)
+            result[name] = converter(value)
 
+    if flyweights is not None:
+        result = flyweights.put(key, result)
+    if trace is not None:
+        trace.decoded(token, pb, result)
     return result
 
 
+def _packer(pack, containers, converters):
+    # proxies are encoded through the containers before packed into Any
+    def convert(value):
+        if isinstance(value, dict):
+            value = dict_to_protobuf(value, None, containers, converters)
+        return pack(value)
+    return convert
+
+
 def dict_to_protobuf(dct, pb=None, containers=CONTAINER_MAP,
                      converters=REVERSE_TYPE_CALLABLE_MAP, strict=True):
+    trace = tracer
+    if trace is not None:
+        token = trace.enter(dct)
+
     default = container_to_message(dct, containers)
-    if pb:
-        if default:
-            pb.MergeFrom(default)
-    else:
+    if pb is None:
         pb = default
     pb = pb if isinstance(pb, Message) else pb()
+    if default is not None and default is not pb:
+        # generic containers (e.g. the base proxy) carry no defaults
+        if isinstance(default, pb.__class__):
+            pb.MergeFrom(default)
 
+    plan, members = field_plan(pb.DESCRIPTOR), {}
+    wellknown = encode_plan(pb.DESCRIPTOR, converters)
     for k, v in dct.items():
         try:
             # TODO silently skip undifened fields
-            field = pb.DESCRIPTOR.fields_by_name[k]
+            _, field, kind, repeated, oneof = plan[k]
         except:
             if not strict:
                 continue
             else:
                 raise
+        if oneof is not None:
+            # at most one member per group, setting another one would
+            # silently clear the former
+            if v is None:
+                continue
+            member = members.setdefault(oneof, k)
+            if member != k:
+                raise ValueError('{} and {} are both members of oneof '
+                                 '{}'.format(member, k, oneof))
         pb_value = getattr(pb, k, None)
-        if field.label == FieldDescriptor.LABEL_REPEATED:
+        convert, packed = wellknown.get(k, (None, False))
+        if packed:
+            convert = _packer(convert, containers, converters)
+
+        if kind == MAP:
+            _, value_field, value_kind, _, _ = map_plan(field)[1]
+            if convert is not None:
+                for key, item in v.items():
+                    pb_value[key].CopyFrom(convert(item))
+            elif value_kind == MESSAGE:
+                # message values can only be created in place
+                for key, item in v.items():
+                    dict_to_protobuf(item, pb_value[key],
+                                     containers, converters)
+            elif value_kind == ENUM:
+                pb_value.update((key, label_to_enum(value_field, item))
+                                for key, item in v.items())
+            elif value_field.type in converters:
+                convert = converters[value_field.type]
+                pb_value.update((key, convert(item))
+                                for key, item in v.items())
+            else:
+                pb_value.update(v)
+        elif convert is not None:
+            # well-known types are converted to messages by full name
+            if repeated:
+                pb_value.extend(map(convert, v))
+            elif v is not None:
+                pb_value.CopyFrom(convert(v))
+        elif repeated:
             for item in v:
-                if field.type == FieldDescriptor.TYPE_MESSAGE:
+                if kind == MESSAGE:
                     dict_to_protobuf(item, pb_value.add(),
                                      containers, converters)
-                elif field.type == FieldDescriptor.TYPE_ENUM:
+                elif kind == ENUM:
                     pb_value.append(label_to_enum(field, item))
                 else:
                     pb_value.append(item)
-        elif field.type == FieldDescriptor.TYPE_MESSAGE:
+        elif kind == MESSAGE:
             dict_to_protobuf(v, pb_value, containers, converters)
+            if oneof is not None:
+                pb_value.SetInParent()  # selects empty messages too
         else:
             if field.type in converters:
                 v = converters[field.type](v)
@@ -134,4 +415,6 @@ def dict_to_protobuf(dct, pb=None, containers=CONTAINER_MAP,
 
             setattr(pb, field.name, v)
 
+    if trace is not None:
+        trace.encoded(token, dct, pb, default is not None)
     return pb
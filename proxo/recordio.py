@@ -0,0 +1,108 @@
+from __future__ import absolute_import, division, print_function
+
+from traceback import clear_frames
+
+from .messages import decode
+from .stream import parse, serialize
+
+__all__ = ('Decoder',
+           'encode_record',
+           'encode_records',
+           'decode_records')
+
+
+# RecordIO framing used by the Mesos v1 HTTP API: "<length>\n<bytes>"
+
+MAX_HEADER = 20
+
+
+def parse_header(header):
+    # length of a record from its header without the newline, None if it's
+    # not a plain decimal number (signs, spaces and underscores are refused)
+    header = bytes(header)
+    if len(header) > MAX_HEADER or not header.isdigit():
+        return None
+    return int(header)
+
+
+def encode_record(proxy):
+    data = serialize(proxy)
+    return str(len(data)).encode('ascii') + b'\n' + data
+
+
+def encode_records(proxies):
+    for proxy in proxies:
+        yield encode_record(proxy)
+
+
+class Decoder(object):
+    # incremental decoder accepting arbitrary chunk boundaries; chunks are
+    # appended to one buffer which is trimmed after the parsed records
+
+    def __init__(self, proto):
+        self.proto = proto
+        self.buffer = bytearray()
+        self.length = None  # length of the record currently read
+
+    def feed(self, chunk):
+        # a malformed record is skipped and its error raised, the records
+        # parsed before it are attached to the error as its records
+        buffer = self.buffer
+        buffer.extend(chunk)
+        view = memoryview(buffer)
+        records, pos = [], 0
+
+        try:
+            while True:
+                if self.length is None:
+                    newline = buffer.find(b'\n', pos, pos + MAX_HEADER + 1)
+                    if newline < 0:
+                        if len(buffer) - pos > MAX_HEADER:
+                            pos = len(buffer)  # can't resynchronize
+                            raise ValueError('Invalid RecordIO header')
+                        break
+                    self.length = parse_header(buffer[pos:newline])
+                    if self.length is None:
+                        header, pos = bytes(buffer[pos:newline]), len(buffer)
+                        raise ValueError(
+                            'Invalid RecordIO header {!r}'.format(header))
+                    pos = newline + 1
+                if len(buffer) - pos < self.length:
+                    break
+                end = pos + self.length
+                self.length = None
+                with view[pos:end] as data:
+                    pos = end
+                    records.append(decode(parse(self.proto, data)))
+        except Exception as e:
+            # the frames of the parser may still hold views of the buffer
+            error = e
+            while error is not None:
+                clear_frames(error.__traceback__)
+                error = error.__context__
+            e.records = records
+            raise
+        finally:
+            view.release()
+            if pos:
+                del buffer[:pos]
+
+        return records
+
+    def close(self):
+        if self.buffer or self.length is not None:
+            raise EOFError('Truncated RecordIO stream')
+
+
+def decode_records(chunks, proto):
+    decoder = Decoder(proto)
+    for chunk in chunks:
+        try:
+            records = decoder.feed(chunk)
+        except Exception as e:
+            for record in getattr(e, 'records', ()):
+                yield record
+            raise
+        for record in records:
+            yield record
+    decoder.close()
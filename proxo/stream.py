@@ -0,0 +1,96 @@
+from __future__ import absolute_import, division, print_function
+
+from google.protobuf.message import Message
+
+from .messages import encode, decode
+from .passthrough import Tracked, splice
+from .wire import encode_varint, decode_varint
+
+__all__ = ('write_delimited',
+           'read_delimited',
+           'write_frames',
+           'read_frames',
+           'encode_varint',
+           'decode_varint')
+
+
+CHUNK_SIZE = 1 << 16
+
+
+def parse(proto, data):
+    pb = proto()
+    try:
+        pb.ParseFromString(data)
+    except TypeError:  # backend not accepting memoryviews
+        pb.ParseFromString(bytes(data))
+    return pb
+
+
+def serialize(proxy):
+    if isinstance(proxy, Tracked):
+        return splice(proxy)  # pass-through proxies reuse their buffer
+    pb = proxy if isinstance(proxy, Message) else encode(proxy)
+    return pb.SerializePartialToString()
+
+
+def write_frames(fileobj, frames, chunk_size=CHUNK_SIZE):
+    # length delimited frames, written in batches of about chunk_size bytes
+    parts, size = [], 0
+    for data in frames:
+        header = encode_varint(len(data))
+        parts.extend((header, data))
+        size += len(header) + len(data)
+        if size >= chunk_size:
+            fileobj.write(b''.join(parts))
+            parts, size = [], 0
+    if parts:
+        fileobj.write(b''.join(parts))
+
+
+def write_delimited(fileobj, proxies, chunk_size=CHUNK_SIZE):
+    write_frames(fileobj, map(serialize, proxies), chunk_size)
+
+
+def read_frames(fileobj, chunk_size=CHUNK_SIZE):
+    # frames are sliced from a single reused buffer, which only grows to
+    # accommodate the largest frame seen; the yielded views are only valid
+    # until the next frame is requested
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    readinto = getattr(fileobj, 'readinto', None)
+    start = end = 0
+
+    while True:
+        length, pos = decode_varint(buffer, start, end)
+        if length is not None and end - pos >= length:
+            yield view[pos:pos + length]
+            start = pos + length
+            continue
+
+        # not enough data for a whole frame: compact, grow and refill
+        needed = (pos - start) + (length or 0) + 10
+        if needed > len(buffer):
+            view.release()
+            grown = bytearray(max(needed, 2 * len(buffer)))
+            grown[:end - start] = buffer[start:end]
+            buffer, view = grown, memoryview(grown)
+        elif start:
+            buffer[:end - start] = buffer[start:end]
+        end, start = end - start, 0
+
+        if readinto is not None:
+            read = readinto(view[end:])
+        else:
+            data = fileobj.read(len(buffer) - end)
+            read = len(data)
+            buffer[end:end + read] = data
+        if not read:
+            if end:
+                raise EOFError('Truncated delimited message stream')
+            return
+        end += read
+
+
+def read_delimited(fileobj, proto, chunk_size=CHUNK_SIZE):
+    for frame in read_frames(fileobj, chunk_size):
+        yield decode(parse(proto, frame))
@@ -0,0 +1,14 @@
+from __future__ import absolute_import, division, print_function
+
+import pytest
+
+from proxo.messages import MessageProxy
+
+
+@pytest.fixture
+def registry():
+    # proxies defined in a test are unregistered afterwards, restored in
+    # place because decode holds the registry list itself
+    registered = list(MessageProxy.registry)
+    yield MessageProxy.registry
+    MessageProxy.registry[:] = registered
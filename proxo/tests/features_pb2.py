@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: features.proto
+"""Generated protocol buffer code."""
+from google.protobuf.internal import builder as _builder
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+from google.protobuf import any_pb2 as google_dot_protobuf_dot_any__pb2
+from google.protobuf import duration_pb2 as google_dot_protobuf_dot_duration__pb2
+from google.protobuf import struct_pb2 as google_dot_protobuf_dot_struct__pb2
+from google.protobuf import timestamp_pb2 as google_dot_protobuf_dot_timestamp__pb2
+from google.protobuf import wrappers_pb2 as google_dot_protobuf_dot_wrappers__pb2
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0e\x66\x65\x61tures.proto\x12\x05tests\x1a\x19google/protobuf/any.proto\x1a\x1egoogle/protobuf/duration.proto\x1a\x1cgoogle/protobuf/struct.proto\x1a\x1fgoogle/protobuf/timestamp.proto\x1a\x1egoogle/protobuf/wrappers.proto\"\xab\x02\n\x05\x45vent\x12\x1f\n\x04type\x18\x01 \x01(\x0e\x32\x11.tests.Event.Type\x12)\n\x08launched\x18\x02 \x01(\x0b\x32\x15.tests.Event.LaunchedH\x00\x12%\n\x06\x66\x61iled\x18\x03 \x01(\x0b\x32\x13.tests.Event.FailedH\x00\x12\x0e\n\x04note\x18\x04 \x01(\tH\x00\x12\x0e\n\x04\x63ode\x18\x05 \x01(\x05H\x00\x1a*\n\x08Launched\x12\x0f\n\x07task_id\x18\x01 \x01(\t\x12\r\n\x05hosts\x18\x02 \x03(\t\x1a)\n\x06\x46\x61iled\x12\x0f\n\x07task_id\x18\x01 \x01(\t\x12\x0e\n\x06reason\x18\x02 \x01(\t\"-\n\x04Type\x12\x0b\n\x07UNKNOWN\x10\x00\x12\x0c\n\x08LAUNCHED\x10\x01\x12\n\n\x06\x46\x41ILED\x10\x02\x42\t\n\x07payload\"\xc0\x02\n\x04Spec\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\'\n\x06labels\x18\x02 \x03(\x0b\x32\x17.tests.Spec.LabelsEntry\x12%\n\x05\x63odes\x18\x03 \x03(\x0b\x32\x16.tests.Spec.CodesEntry\x12%\n\x05tasks\x18\x04 \x03(\x0b\x32\x16.tests.Spec.TasksEntry\x1a-\n\x0bLabelsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\x1a?\n\nCodesEntry\x12\x0b\n\x03key\x18\x01 \x01(\x05\x12 \n\x05value\x18\x02 \x01(\x0e\x32\x11.tests.Event.Type:\x02\x38\x01\x1a\x43\n\nTasksEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12$\n\x05value\x18\x02 \x01(\x0b\x32\x15.tests.Event.Launched:\x02\x38\x01\"\xb4\x03\n\tHeartbeat\x12(\n\x04time\x18\x01 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12+\n\x08interval\x18\x02 \x01(\x0b\x32\x19.google.protobuf.Duration\x12(\n\x07\x64\x65tails\x18\x03 \x01(\x0b\x32\x17.google.protobuf.Struct\x12*\n\x04load\x18\x04 \x01(\x0b\x32\x1c.google.protobuf.DoubleValue\x12,\n\x07\x63ounter\x18\x05 \x01(\x0b\x32\x1b.google.protobuf.Int64Value\x12*\n\x05token\x18\x06 \x01(\x0b\x32\x1b.google.protobuf.BytesValue\x12+\n\x07history\x18\x07 \x03(\x0b\x32\x1a.google.protobuf.Timestamp\x12,\n\x06values\x18\x08 \x03(\x0b\x32\x1c.tests.Heartbeat.ValuesEntry\x1a\x45\n\x0bValuesEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12%\n\x05value\x18\x02 \x01(\x0b\x32\x16.google.protobuf.Value:\x02\x38\x01\"\xda\x01\n\x08\x45nvelope\x12\n\n\x02id\x18\x01 \x01(\t\x12%\n\x07payload\x18\x02 \x01(\x0b\x32\x14.google.protobuf.Any\x12)\n\x0b\x61ttachments\x18\x03 \x03(\x0b\x32\x14.google.protobuf.Any\x12+\n\x06\x65xtras\x18\x04 \x03(\x0b\x32\x1b.tests.Envelope.ExtrasEntry\x1a\x43\n\x0b\x45xtrasEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12#\n\x05value\x18\x02 \x01(\x0b\x32\x14.google.protobuf.Any:\x02\x38\x01\x62\x06proto3')
+
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, globals())
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'features_pb2', globals())
+if _descriptor._USE_C_DESCRIPTORS == False:
+
+  DESCRIPTOR._options = None
+  _SPEC_LABELSENTRY._options = None
+  _SPEC_LABELSENTRY._serialized_options = b'8\001'
+  _SPEC_CODESENTRY._options = None
+  _SPEC_CODESENTRY._serialized_options = b'8\001'
+  _SPEC_TASKSENTRY._options = None
+  _SPEC_TASKSENTRY._serialized_options = b'8\001'
+  _HEARTBEAT_VALUESENTRY._options = None
+  _HEARTBEAT_VALUESENTRY._serialized_options = b'8\001'
+  _ENVELOPE_EXTRASENTRY._options = None
+  _ENVELOPE_EXTRASENTRY._serialized_options = b'8\001'
+  _EVENT._serialized_start=180
+  _EVENT._serialized_end=479
+  _EVENT_LAUNCHED._serialized_start=336
+  _EVENT_LAUNCHED._serialized_end=378
+  _EVENT_FAILED._serialized_start=380
+  _EVENT_FAILED._serialized_end=421
+  _EVENT_TYPE._serialized_start=423
+  _EVENT_TYPE._serialized_end=468
+  _SPEC._serialized_start=482
+  _SPEC._serialized_end=802
+  _SPEC_LABELSENTRY._serialized_start=623
+  _SPEC_LABELSENTRY._serialized_end=668
+  _SPEC_CODESENTRY._serialized_start=670
+  _SPEC_CODESENTRY._serialized_end=733
+  _SPEC_TASKSENTRY._serialized_start=735
+  _SPEC_TASKSENTRY._serialized_end=802
+  _HEARTBEAT._serialized_start=805
+  _HEARTBEAT._serialized_end=1241
+  _HEARTBEAT_VALUESENTRY._serialized_start=1172
+  _HEARTBEAT_VALUESENTRY._serialized_end=1241
+  _ENVELOPE._serialized_start=1244
+  _ENVELOPE._serialized_end=1462
+  _ENVELOPE_EXTRASENTRY._serialized_start=1395
+  _ENVELOPE_EXTRASENTRY._serialized_end=1462
+# @@protoc_insertion_point(module_scope)
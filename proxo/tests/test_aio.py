@@ -0,0 +1,96 @@
+from __future__ import absolute_import, division, print_function
+
+import asyncio
+import pytest
+import mesos_pb2
+
+from proxo.aio import StreamWriter, read_stream, write_stream
+from mesos import TaskID, TaskStatus
+
+
+class Writer(object):
+
+    def __init__(self):
+        self.writes = []
+        self.drains = 0
+        self.closed = False
+
+    def write(self, data):
+        self.writes.append(data)
+
+    async def drain(self):
+        self.drains += 1
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def statuses():
+    return [TaskStatus(task_id=TaskID(value='task-{}'.format(i)),
+                       state='TASK_RUNNING', data=b'x' * i)
+            for i in range(50)]
+
+
+async def roundtrip(proxies, framing, threshold):
+    writer = Writer()
+    await write_stream(writer, proxies, framing=framing, batch_size=256)
+
+    reader = asyncio.StreamReader()
+    reader.feed_data(b''.join(writer.writes))
+    reader.feed_eof()
+    decoded = [proxy async for proxy in read_stream(
+        reader, mesos_pb2.TaskStatus, framing=framing, threshold=threshold)]
+    return writer, decoded
+
+
+@pytest.mark.parametrize('framing', ['recordio', 'varint'])
+@pytest.mark.parametrize('threshold', [0, 25, 1 << 20])
+def test_roundtrip(statuses, framing, threshold):
+    writer, decoded = asyncio.run(roundtrip(statuses, framing, threshold))
+
+    assert 1 < len(writer.writes) < len(statuses)
+    assert writer.drains == len(writer.writes)
+    assert len(decoded) == len(statuses)
+    for status, proxy in zip(statuses, decoded):
+        assert isinstance(proxy, TaskStatus)
+        assert proxy.task_id == status.task_id
+        assert proxy.data == status.data
+
+
+def test_truncated_stream(statuses):
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b'10\nabc')
+        reader.feed_eof()
+        return [p async for p in read_stream(reader, mesos_pb2.TaskStatus)]
+
+    with pytest.raises(EOFError):
+        asyncio.run(read())
+
+
+@pytest.mark.parametrize('header', [b'-1\n', b'+3\n', b' 3\n', b'1_0\n',
+                                    b'\n', b'1' * 21 + b'\n'])
+def test_invalid_length(header):
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(header + b'abc')
+        reader.feed_eof()
+        return [p async for p in read_stream(reader, mesos_pb2.TaskStatus)]
+
+    with pytest.raises(ValueError, match='Invalid RecordIO header'):
+        asyncio.run(read())
+
+
+def test_writer_close(statuses):
+    async def write():
+        writer = Writer()
+        stream = StreamWriter(writer)
+        await stream.write(statuses[0])
+        assert writer.writes == []
+        await stream.close()
+        return writer
+
+    writer = asyncio.run(write())
+    assert writer.closed
+    assert len(writer.writes) == 1
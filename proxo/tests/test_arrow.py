@@ -0,0 +1,53 @@
+from __future__ import absolute_import, division, print_function
+
+import pytest
+import mesos_pb2
+
+pa = pytest.importorskip('pyarrow')
+
+from proxo.arrow import (from_record_batch, read_parquet, schema,  # noqa
+                         to_record_batch, write_parquet)
+
+
+@pytest.fixture
+def statuses():
+    statuses = []
+    for i in range(100):
+        status = mesos_pb2.TaskStatus(state=mesos_pb2.TASK_RUNNING,
+                                      data=b'\x00' * (i % 3))
+        status.task_id.value = 'task-{}'.format(i)
+        if i % 2:
+            status.slave_id.value = 'slave-{}'.format(i)
+            status.labels.labels.add(key='k', value=str(i))
+        statuses.append(status)
+    return statuses
+
+
+def test_schema():
+    s = schema(mesos_pb2.TaskStatus.DESCRIPTOR)
+    assert s.field('task_id').type == pa.struct([('value', pa.string())])
+    assert s.field('state').type == pa.dictionary(pa.int32(), pa.string())
+    assert s.field('data').type == pa.binary()
+    assert s.field('labels').type.field('labels').type == pa.list_(
+        pa.struct([('key', pa.string()), ('value', pa.string())]))
+
+    with pytest.raises(ValueError):
+        schema(mesos_pb2.ContainerID.DESCRIPTOR)  # recursive
+
+
+def test_record_batch_roundtrip(statuses):
+    batch = to_record_batch(statuses)
+    assert batch.num_rows == 100
+    assert batch.column('state')[0].as_py() == 'TASK_RUNNING'
+    assert batch.column('slave_id')[0].as_py() is None
+    assert batch.column('slave_id')[1].as_py() == {'value': 'slave-1'}
+    assert batch.column('message')[0].as_py() is None  # unset optional
+
+    assert from_record_batch(batch, mesos_pb2.TaskStatus) == statuses
+
+
+def test_parquet_roundtrip(statuses, tmpdir):
+    path = str(tmpdir.join('statuses.parquet'))
+    write_parquet(path, iter(statuses), mesos_pb2.TaskStatus, batch_size=30)
+    assert list(read_parquet(path, mesos_pb2.TaskStatus,
+                             batch_size=7)) == statuses
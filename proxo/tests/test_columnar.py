@@ -0,0 +1,111 @@
+from __future__ import absolute_import, division, print_function
+
+import pytest
+import mesos_pb2
+
+np = pytest.importorskip('numpy')
+
+from proxo.columnar import decode_columns, encode_columns  # noqa
+from mesos import Mem  # noqa
+
+
+@pytest.fixture
+def offer():
+    offer = mesos_pb2.Offer(hostname='localhost')
+    for i in range(10):
+        offer.resources.add(name='cpus', type=mesos_pb2.Value.SCALAR,
+                            scalar=mesos_pb2.Value.Scalar(value=i * 0.5))
+    offer.resources.add(name='ports', type=mesos_pb2.Value.RANGES)
+    return offer
+
+
+def test_decode_columns(offer):
+    columns = decode_columns(offer.resources,
+                             ['name', 'type', 'scalar.value'])
+
+    assert columns['name'].dtype == object
+    assert columns['name'][0] == 'cpus'
+    assert columns['name'][-1] == 'ports'
+    assert columns['type'].dtype == np.int32
+    assert list(columns['type']) == [mesos_pb2.Value.SCALAR] * 10 + [
+        mesos_pb2.Value.RANGES]
+    assert columns['scalar.value'].dtype == np.float64
+    assert columns['scalar.value'].sum() == 22.5
+    assert columns['scalar.value'][-1] == 0  # unset sub-message default
+
+
+def test_enum_labels(offer):
+    columns = decode_columns(iter(offer.resources), ['type'], enums='labels')
+    assert list(columns['type']) == ['SCALAR'] * 10 + ['RANGES']
+
+
+def test_structured(offer):
+    array = decode_columns(offer.resources, ['name', 'scalar.value'],
+                           structured=True)
+    assert array.shape == (11,)
+    assert array.dtype.names == ('name', 'scalar.value')
+    assert array['scalar.value'][3] == 1.5
+
+
+def test_empty():
+    columns = decode_columns([], ['scalar.value'], proto=mesos_pb2.Resource)
+    assert len(columns['scalar.value']) == 0
+    with pytest.raises(ValueError):
+        decode_columns([], ['scalar.value'])
+
+
+def test_invalid_paths(offer):
+    with pytest.raises(ValueError):
+        decode_columns([offer], ['resources'])
+    with pytest.raises(ValueError):
+        decode_columns([offer], ['id'])
+    with pytest.raises(KeyError):
+        decode_columns([offer], ['missing'])
+
+
+def test_encode_columns():
+    cpus = np.array([0.1, 0.5, 1.0])
+    resources = encode_columns({'scalar.value': cpus,
+                                'name': 'cpus',
+                                'type': 'SCALAR'}, mesos_pb2.Resource)
+
+    assert len(resources) == 3
+    assert all(isinstance(r, mesos_pb2.Resource) for r in resources)
+    assert [r.scalar.value for r in resources] == [0.1, 0.5, 1.0]
+    assert {r.name for r in resources} == {'cpus'}
+    assert {r.type for r in resources} == {mesos_pb2.Value.SCALAR}
+
+
+def test_encode_columns_prototype_defaults():
+    task = mesos_pb2.TaskInfo(name='task')
+    mem = np.array([16, 32], dtype=np.int64)
+    encode_columns({'scalar.value': mem}, Mem, into=task.resources)
+
+    assert len(task.resources) == 2
+    assert task.resources[1].name == 'mem'
+    assert task.resources[1].type == mesos_pb2.Value.SCALAR
+    assert task.resources[1].scalar.value == 32
+
+
+def test_encode_columns_serialize():
+    data = encode_columns({'value': np.array(['a', 'b'], dtype=object)},
+                          mesos_pb2.TaskID, serialize=True)
+    assert data == [mesos_pb2.TaskID(value='a').SerializeToString(),
+                    mesos_pb2.TaskID(value='b').SerializeToString()]
+
+
+def test_encode_columns_roundtrip(offer):
+    fields = ['name', 'type', 'scalar.value']
+    columns = decode_columns(offer.resources, fields)
+    resources = encode_columns(columns, mesos_pb2.Resource)
+    assert decode_columns(resources, fields, enums='labels')['type'][0] == (
+        'SCALAR')
+    for field in fields:
+        assert list(decode_columns(resources, fields)[field]) == list(
+            columns[field])
+
+
+def test_encode_columns_length_mismatch():
+    with pytest.raises(ValueError):
+        encode_columns({'name': ['a', 'b'], 'scalar.value': [1.0]},
+                       mesos_pb2.Resource)
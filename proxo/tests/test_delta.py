@@ -0,0 +1,144 @@
+from __future__ import absolute_import, division, print_function
+
+import io
+import pytest
+import mesos_pb2
+
+from proxo import decode, encode
+from proxo.delta import DeltaDecoder, DeltaEncoder, read_deltas, write_deltas
+from proxo.stream import write_delimited
+from mesos import Cpus, Mem, Offer, OfferID, TaskStatus
+
+STATES = ['TASK_STAGING', 'TASK_STARTING', 'TASK_RUNNING', 'TASK_FINISHED']
+
+
+@pytest.fixture
+def statuses():
+    snapshots = []
+    for i in range(40):
+        status = decode(mesos_pb2.TaskStatus(
+            task_id=mesos_pb2.TaskID(value='task-{}'.format(i % 4)),
+            state=mesos_pb2.TASK_STAGING,
+            message='x' * 100,
+            slave_id=mesos_pb2.SlaveID(value='agent-{}'.format(i % 4))))
+        status.state = STATES[(i // 4) % 4]
+        status.timestamp = float(i)
+        if i % 3 == 0:
+            status.message = 'y' * 100
+        snapshots.append(status)
+    return snapshots
+
+
+def test_roundtrip(statuses):
+    data = io.BytesIO()
+    write_deltas(data, statuses, mesos_pb2.TaskStatus, key='task_id.value',
+                 interval=4)
+    data.seek(0)
+    decoded = list(read_deltas(data, mesos_pb2.TaskStatus,
+                               key='task_id.value'))
+
+    assert len(decoded) == len(statuses)
+    for status, result in zip(statuses, decoded):
+        assert isinstance(result, TaskStatus)
+        assert encode(result) == encode(status)
+
+
+def test_smaller_than_plain(statuses):
+    plain, deltas = io.BytesIO(), io.BytesIO()
+    write_delimited(plain, statuses)
+    write_deltas(deltas, statuses, mesos_pb2.TaskStatus, key='task_id.value')
+    assert len(deltas.getvalue()) < len(plain.getvalue())
+
+
+def test_structural_sharing(statuses):
+    encoder = DeltaEncoder(mesos_pb2.TaskStatus)
+    decoder = DeltaDecoder(mesos_pb2.TaskStatus)
+    first = decoder.decode(encoder.encode(statuses[0]))
+    second = decode(encode(statuses[0]))
+    second.state = 'TASK_FAILED'
+    second = decoder.decode(encoder.encode(second))
+
+    assert second.state == 'TASK_FAILED'
+    assert first.state == 'TASK_STAGING'
+    assert second.slave_id is first.slave_id
+    assert second.container_status is first.container_status
+    with pytest.raises(TypeError):
+        second.state = 'TASK_LOST'
+
+
+def test_removed_fields(statuses):
+    encoder = DeltaEncoder(mesos_pb2.TaskStatus)
+    decoder = DeltaDecoder(mesos_pb2.TaskStatus)
+    decoder.decode(encoder.encode(statuses[0]))
+    status = decode(encode(statuses[0]))
+    del status['message']
+    result = decoder.decode(encoder.encode(status))
+    assert 'message' not in result
+    assert result.task_id.value == 'task-0'
+
+
+def test_keyframes(statuses):
+    encoder = DeltaEncoder(mesos_pb2.TaskStatus, interval=3)
+    frames = [encoder.encode(status) for status in statuses[:7]]
+    assert [frame[:1] for frame in frames] == [b'\x00', b'\x01', b'\x01'] * 2 + [
+        b'\x00']
+
+
+def test_missing_keyframe(statuses):
+    encoder = DeltaEncoder(mesos_pb2.TaskStatus, key='task_id.value')
+    frames = [encoder.encode(status) for status in statuses[:8]]
+    decoder = DeltaDecoder(mesos_pb2.TaskStatus, key='task_id.value')
+    with pytest.raises(KeyError):
+        decoder.decode(frames[4])
+    with pytest.raises(ValueError):
+        decoder.decode(b'\x07')
+
+
+def test_bounded_keys(statuses):
+    data = io.BytesIO()
+    write_deltas(data, statuses, mesos_pb2.TaskStatus, key='task_id.value',
+                 keys=3)
+    data.seek(0)
+    decoded = list(read_deltas(data, mesos_pb2.TaskStatus,
+                               key='task_id.value', keys=3))
+    assert [encode(r) for r in decoded] == [encode(s) for s in statuses]
+
+    # four keys in turn, each evicted before it's seen again
+    encoder = DeltaEncoder(mesos_pb2.TaskStatus, key='task_id.value', keys=3)
+    frames = [encoder.encode(status) for status in statuses]
+    assert set(frame[:1] for frame in frames) == {b'\x00'}
+    assert len(encoder.previous) == 3
+
+
+def test_discard(statuses):
+    encoder = DeltaEncoder(mesos_pb2.TaskStatus, key='task_id.value')
+    decoder = DeltaDecoder(mesos_pb2.TaskStatus, key='task_id.value')
+    for status in statuses[:8]:
+        decoder.decode(encoder.encode(status))
+    encoder.discard('task-1')
+    decoder.discard('task-1')
+    assert len(encoder.previous) == len(decoder.previous) == 3
+
+    frame = encoder.encode(statuses[9])  # task-1 again
+    assert frame[:1] == b'\x00'
+    assert decoder.decode(frame).task_id.value == 'task-1'
+
+
+def test_resources_only():
+    # scalar resources compare equal by value, the names must survive
+    first = decode(encode(Offer(id=OfferID(value='offer'),
+                                hostname='localhost', resources=[Cpus(1)])))
+    second = decode(encode(first))
+    second.resources = [Mem(1)]
+    role = decode(encode(first))
+    role.resources[0].role = 'production'
+
+    data = io.BytesIO()
+    write_deltas(data, [first, second, role], mesos_pb2.Offer,
+                 key='id.value')
+    data.seek(0)
+    decoded = list(read_deltas(data, mesos_pb2.Offer, key='id.value'))
+
+    assert [r.name for r in encode(decoded[0]).resources] == ['cpus']
+    assert [r.name for r in encode(decoded[1]).resources] == ['mem']
+    assert encode(decoded[2]).resources[0].role == 'production'
@@ -0,0 +1,74 @@
+from __future__ import absolute_import, division, print_function
+
+import logging
+import mesos_pb2
+
+from proxo import decode, encode, protobuf
+from proxo.instrument import disable, enable, instrumented, logging_sink
+from mesos import TaskID, TaskStatus
+
+
+def status(i=0):
+    pb = mesos_pb2.TaskStatus(state=mesos_pb2.TASK_RUNNING,
+                              message='message {}'.format(i))
+    pb.task_id.value = 'task-{}'.format(i)
+    return pb
+
+
+def test_disabled():
+    assert protobuf.tracer is None
+    with instrumented() as stats:
+        assert protobuf.tracer is stats
+    assert protobuf.tracer is None
+
+
+def test_counts():
+    reports = []
+    with instrumented(sink=reports.append) as stats:
+        proxies = [decode(status(i)) for i in range(3)]
+        encoded = [encode(proxy) for proxy in proxies]
+
+    assert all(isinstance(proxy, TaskStatus) for proxy in proxies)
+    assert all(isinstance(proxy.task_id, TaskID) for proxy in proxies)
+
+    assert stats.decodes['mesos.TaskStatus'][0] == 3
+    assert stats.decodes['mesos.TaskID'][0] == 3
+    assert stats.encodes['mesos.TaskStatus'][0] == 3
+    assert stats.decodes['mesos.TaskStatus'][1] > 0
+    assert stats.decodes['mesos.TaskStatus'][2] == sum(
+        status(i).ByteSize() for i in range(3))
+    assert stats.encodes['mesos.TaskStatus'][2] == sum(
+        pb.ByteSize() for pb in encoded)
+    assert stats.hits['mesos.TaskStatus'] == 6  # decodes and encodes
+
+    metrics, = reports
+    assert metrics['proxo_decode_total{type="mesos.TaskStatus"}'] == 3
+    assert metrics['proxo_registry_hits_total{proxy="mesos.TaskID"}'] == 6
+
+
+def test_misses():
+    with instrumented() as stats:
+        protobuf.protobuf_to_dict(status())
+        protobuf.dict_to_protobuf({'value': 'x'}, mesos_pb2.TaskID)
+
+    assert stats.misses['mesos.TaskStatus'] == 1
+    assert stats.misses['mesos.TaskID'] == 2
+    assert stats.hits == {}
+
+
+def test_sizes_disabled():
+    with instrumented(sizes=False) as stats:
+        decode(status())
+    assert stats.decodes['mesos.TaskStatus'][2] == 0
+    assert not any('bytes' in name for name in stats.snapshot())
+
+
+def test_enable_logging(caplog):
+    stats = enable(sink=logging_sink())
+    try:
+        decode(status())
+    finally:
+        with caplog.at_level(logging.INFO, logger='proxo.instrument'):
+            assert disable() is stats
+    assert protobuf.tracer is None
+    assert 'proxo_decode_total{type="mesos.TaskStatus"} 1' in caplog.text
@@ -0,0 +1,120 @@
+from __future__ import absolute_import, division, print_function
+
+import json
+import pytest
+import mesos_pb2
+
+from google.protobuf import json_format
+from features_pb2 import Spec
+from sample_pb2 import MessageOfTypes
+from proxo import decode
+from proxo.json import dumps, loads, to_json
+from proxo.messages import Map
+from mesos import Cpus, Offer, OfferID, FrameworkID, SlaveID, TaskStatus
+
+
+@pytest.fixture
+def m():
+    m = MessageOfTypes()
+    m.dubl = float('inf')
+    m.flot = 0.5
+    m.i32 = -5
+    m.i64 = 2 ** 63 - 1
+    m.ui32 = 7
+    m.ui64 = 2 ** 64 - 1
+    m.si32 = -1
+    m.si64 = -(2 ** 40)
+    m.f32 = 3
+    m.f64 = 4
+    m.sf32 = -3
+    m.sf64 = -4
+    m.bol = True
+    m.strng = 'string'
+    m.byts = b'\n\x14\x1e\xff'
+    m.nested.req = 'req'
+    m.enm = MessageOfTypes.C
+    m.enmRepeated.extend([MessageOfTypes.A, MessageOfTypes.C])
+    m.range.extend(range(3))
+    m.nestedRepeated.add(req='a')
+    return m
+
+
+def test_protobuf_json_mapping(m):
+    expected = json_format.MessageToDict(m)
+    assert to_json(decode(m), MessageOfTypes.DESCRIPTOR) == expected
+    assert json.loads(dumps(decode(m), MessageOfTypes.DESCRIPTOR)) == expected
+
+    names = to_json(decode(m), MessageOfTypes.DESCRIPTOR,
+                    preserving_proto_field_name=True)
+    assert names == json_format.MessageToDict(
+        m, preserving_proto_field_name=True)
+
+
+def test_loads(m):
+    data = json_format.MessageToJson(m)
+    proxy = loads(data, MessageOfTypes)
+    assert proxy == decode(m)
+    assert loads(dumps(proxy, MessageOfTypes.DESCRIPTOR), MessageOfTypes) == (
+        proxy)
+
+
+def test_proxies():
+    offer = Offer(id=OfferID(value='offer'),
+                  framework_id=FrameworkID(value='framework'),
+                  slave_id=SlaveID(value='slave'),
+                  hostname='localhost',
+                  resources=[Cpus(1.5)])
+    offer.not_a_field = 'skipped'
+
+    tree = json.loads(dumps(offer))
+    assert tree == {'id': {'value': 'offer'},
+                    'frameworkId': {'value': 'framework'},
+                    'slaveId': {'value': 'slave'},
+                    'hostname': 'localhost',
+                    'resources': [{'name': 'cpus', 'type': 'SCALAR',
+                                   'scalar': {'value': 1.5}}]}
+
+    decoded = loads(dumps(offer), mesos_pb2.Offer)
+    assert isinstance(decoded, Offer)
+    assert decoded.resources[0] == Cpus(1.5)
+
+
+def test_backends():
+    status = TaskStatus(task_id='task', state='TASK_RUNNING',
+                        data=b'\x00\x01', timestamp=float('nan'))
+    expected = {'taskId': {'value': 'task'}, 'state': 'TASK_RUNNING',
+                'data': 'AAE=', 'timestamp': 'NaN'}
+    assert json.loads(dumps(status, backend='json')) == expected
+    assert json.loads(dumps(status, indent=2)) == expected
+    pytest.importorskip('orjson')
+    assert json.loads(dumps(status, backend='orjson')) == expected
+
+
+def test_generic_maps():
+    m = Map(a=b'\x00', b=[Map(c=1.5)])
+    assert json.loads(dumps(m)) == {'a': 'AA==', 'b': [{'c': 1.5}]}
+
+
+def test_unknown_field():
+    with pytest.raises(KeyError):
+        loads('{"missing": 1}', mesos_pb2.TaskID)
+
+
+def test_default_values_omitted():
+    pb = mesos_pb2.TaskStatus(state=mesos_pb2.TASK_RUNNING)
+    pb.task_id.value = 't'
+    expected = json_format.MessageToDict(pb)
+    assert expected == {'taskId': {'value': 't'}, 'state': 'TASK_RUNNING'}
+    assert json.loads(dumps(decode(pb))) == expected
+
+    spec = decode(Spec(name='spec'))
+    assert to_json(spec, Spec.DESCRIPTOR) == {'name': 'spec'}
+    assert to_json(decode(Spec()), Spec.DESCRIPTOR,
+                   including_default_value_fields=True) == (
+        json_format.MessageToDict(Spec(),
+                                  including_default_value_fields=True))
+
+    everything = json.loads(dumps(decode(pb),
+                                  including_default_value_fields=True))
+    assert everything['reason'] == 'REASON_COMMAND_EXECUTOR_FAILED'
+    assert everything['slaveId'] == {'value': ''}
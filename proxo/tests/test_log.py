@@ -0,0 +1,195 @@
+from __future__ import absolute_import, division, print_function
+
+import io
+import os
+import pytest
+import mesos_pb2
+
+from array import array
+from proxo.log import MessageLog
+from proxo.stream import write_delimited
+from mesos import TaskID, TaskStatus
+
+
+def statuses(start, stop):
+    return [TaskStatus(task_id=TaskID(value='task-{}'.format(i)),
+                       state='TASK_RUNNING')
+            for i in range(start, stop)]
+
+
+@pytest.fixture
+def path(tmpdir):
+    path = str(tmpdir.join('statuses.log'))
+    with open(path, 'wb') as fp:
+        write_delimited(fp, statuses(0, 100))
+    return path
+
+
+def test_random_access(path):
+    with MessageLog(path, mesos_pb2.TaskStatus) as log:
+        assert len(log) == 100
+        assert isinstance(log[0], TaskStatus)
+        assert log[0].task_id.value == 'task-0'
+        assert log[42].task_id.value == 'task-42'
+        assert log[-1].task_id.value == 'task-99'
+        assert [s.task_id.value for s in log[10:13]] == [
+            'task-10', 'task-11', 'task-12']
+        assert len(log[::10]) == 10
+        with pytest.raises(IndexError):
+            log[100]
+
+
+def test_iteration(path):
+    with MessageLog(path, mesos_pb2.TaskStatus) as log:
+        ids = [s.task_id.value for s in log]
+    assert ids == ['task-{}'.format(i) for i in range(100)]
+
+
+def test_persisted_index(path):
+    MessageLog(path, mesos_pb2.TaskStatus).close()
+    assert os.path.exists(path + '.idx')
+
+    data = array('Q')
+    with open(path + '.idx', 'rb') as fp:
+        data.frombytes(fp.read())
+    mtime, _, offsets = data[0], data[1], data[2:]
+    assert mtime == os.stat(path).st_mtime_ns
+    assert len(offsets) == 101
+    assert offsets[-1] == os.path.getsize(path)
+
+    with open(path, 'ab') as fp:
+        write_delimited(fp, statuses(100, 110))
+
+    with MessageLog(path, mesos_pb2.TaskStatus) as log:
+        assert len(log) == 110
+        assert log[105].task_id.value == 'task-105'
+    assert os.path.getsize(path + '.idx') == (2 + 111) * 8
+
+
+@pytest.mark.parametrize('count', [50, 100, 150])
+def test_rewritten_log(path, count):
+    MessageLog(path, mesos_pb2.TaskStatus).close()
+    # replaced by a log of differently sized frames
+    with open(path, 'wb') as fp:
+        write_delimited(fp, [TaskStatus(task_id=TaskID(value='t' * i),
+                                        state='TASK_RUNNING')
+                             for i in range(1, count + 1)])
+
+    with MessageLog(path, mesos_pb2.TaskStatus) as log:
+        assert len(log) == count
+        assert [s.task_id.value for s in log[-2:]] == ['t' * (count - 1),
+                                                       't' * count]
+
+
+def test_empty_log(tmpdir):
+    path = str(tmpdir.join('empty.log'))
+    open(path, 'wb').close()
+    with MessageLog(path, mesos_pb2.TaskStatus) as log:
+        assert len(log) == 0
+        assert list(log) == []
+
+
+def test_rewritten_log_same_tail(tmpdir):
+    # same size and last 4 KiB, different frame boundaries before them
+    path = str(tmpdir.join('statuses.log'))
+    small = [TaskStatus(task_id=TaskID(value='a'), message='x' * 50)] * 2
+    buffer = io.BytesIO()
+    write_delimited(buffer, small)
+    size = len(buffer.getvalue())
+    for n in range(size):
+        large = io.BytesIO()
+        write_delimited(large, [TaskStatus(task_id=TaskID(value='b'),
+                                           message='y' * n)])
+        if len(large.getvalue()) == size:
+            break
+    tail = io.BytesIO()
+    write_delimited(tail, statuses(0, 400))
+    assert len(tail.getvalue()) > 4096
+
+    with open(path, 'wb') as fp:
+        fp.write(buffer.getvalue() + tail.getvalue())
+    MessageLog(path, mesos_pb2.TaskStatus).close()
+    with open(path, 'wb') as fp:
+        fp.write(large.getvalue() + tail.getvalue())
+    os.utime(path, ns=(0, 0))
+
+    with MessageLog(path, mesos_pb2.TaskStatus) as log:
+        assert len(log) == 401
+        assert log[0].message == 'y' * n
+        assert log[-1].task_id.value == 'task-399'
+
+
+def test_find(path):
+    indexes = {'task_id': 'task_id.value', 'state': 'state'}
+    with MessageLog(path, mesos_pb2.TaskStatus, indexes=indexes) as log:
+        [status] = log.find(task_id='task-7')
+        assert isinstance(status, TaskStatus)
+        assert status.task_id.value == 'task-7'
+
+        assert len(list(log.find(state='TASK_RUNNING'))) == 100
+        assert list(log.find(state='TASK_FAILED')) == []
+        assert list(log.find(task_id='task-7', state='TASK_FAILED')) == []
+        assert list(log.find(task_id='missing')) == []
+
+        # non-indexed field paths fall back to scanning
+        [status] = list(log.find(**{'task_id.value': 'task-8'}))
+        assert status.task_id.value == 'task-8'
+
+    assert os.path.exists(path + '.task_id.idx')
+    assert os.path.exists(path + '.state.idx')
+
+
+def test_find_extends_index(path):
+    indexes = ['task_id.value']
+    MessageLog(path, mesos_pb2.TaskStatus, indexes=indexes).close()
+
+    with open(path, 'ab') as fp:
+        write_delimited(fp, statuses(100, 110))
+
+    with MessageLog(path, mesos_pb2.TaskStatus, indexes=indexes) as log:
+        assert log.indexes['task_id.value'].count == 110
+        [status] = log.find(**{'task_id.value': 'task-105'})
+        assert status.task_id.value == 'task-105'
+
+
+@pytest.mark.parametrize('count', [50, 100, 150])
+def test_find_rewritten_log(path, count):
+    indexes = ['task_id.value']
+    MessageLog(path, mesos_pb2.TaskStatus, indexes=indexes).close()
+    with open(path, 'wb') as fp:
+        write_delimited(fp, [TaskStatus(task_id=TaskID(value='new-{}'.format(i)),
+                                        state='TASK_RUNNING')
+                             for i in range(count)])
+
+    with MessageLog(path, mesos_pb2.TaskStatus, indexes=indexes) as log:
+        assert log.indexes['task_id.value'].count == count
+        assert list(log.find(**{'task_id.value': 'task-7'})) == []
+        [status] = log.find(**{'task_id.value': 'new-7'})
+        assert status.task_id.value == 'new-7'
+
+
+def test_find_coerces_values(tmpdir):
+    path = str(tmpdir.join('timestamps.log'))
+    with open(path, 'wb') as fp:
+        write_delimited(fp, [TaskStatus(task_id=TaskID(value='task-{}'.format(i)),
+                                        state='TASK_RUNNING', timestamp=i)
+                             for i in range(5)])
+
+    indexes = {'ts': 'timestamp', 'state': 'state', 'id': 'task_id.value'}
+    with MessageLog(path, mesos_pb2.TaskStatus, indexes=indexes) as log:
+        for criteria in [{'ts': 3}, {'ts': 3.0}, {'timestamp': 3},
+                         {'timestamp': 3.0}]:
+            [status] = log.find(**criteria)
+            assert status.task_id.value == 'task-3'
+        assert len(list(log.find(state=mesos_pb2.TASK_RUNNING))) == 5
+        assert len(list(log.find(state='TASK_RUNNING'))) == 5
+        assert list(log.find(ts='three')) == []
+        assert list(log.find(timestamp='three')) == []
+        assert list(log.find(state=1000)) == []
+
+
+def test_invalid_index(path):
+    with pytest.raises(ValueError):
+        MessageLog(path, mesos_pb2.TaskStatus, indexes=['task_id'])
+    with pytest.raises(KeyError):
+        MessageLog(path, mesos_pb2.TaskStatus, indexes=['missing'])
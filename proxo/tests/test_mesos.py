@@ -1,13 +1,14 @@
 from __future__ import absolute_import, division, print_function
 
+import copy
+import pickle
 import pytest
 import mesos_pb2
 
 from proxo import encode, decode, MessageProxy
-from mesos import (CommandInfo, Cpus, Disk, FrameworkID,
-                   FrameworkInfo, Mem, Offer, ResourcesMixin,
-                   ScalarResource, TaskID, TaskInfo,
-                   TaskStatus)
+from mesos import (CommandInfo, Cpus, Disk, ExecutorID, ExecutorInfo,
+                   FrameworkID, FrameworkInfo, Mem, Offer, ResourcesMixin,
+                   ScalarResource, TaskID, TaskInfo, TaskStatus)
 
 
 def test_encode_resources():
@@ -293,3 +294,72 @@ def test_non_strict_encode_task_info():
     assert p.command.value == 'echo 100'
     with pytest.raises(AttributeError):
         p.status
+
+
+def test_absent_fields_read_defaults():
+    o = Offer(resources=[Cpus(1), Mem(128)])
+
+    assert o.url is None
+    assert o.executor_ids == ()
+    assert o.attributes == ()
+    assert o.hostname == ''
+    assert hasattr(o, 'url')
+    assert 'url' not in o
+
+    s = TaskStatus()
+    assert s.state == 'TASK_STAGING'
+    assert s.message == ''
+
+    with pytest.raises(AttributeError):
+        o.non_existing_field
+
+
+def test_field_accessors_keep_properties():
+    e = ExecutorInfo(id='test-executor')
+    assert e.id == ExecutorID(value='test-executor')
+    assert isinstance(e.executor_id, ExecutorID)
+
+    o = decode(mesos_pb2.Offer(hostname='localhost'))
+    assert o.hostname == 'localhost'
+    o.hostname = 'remote'
+    assert o['hostname'] == 'remote'
+
+
+def test_pickle_proxies():
+    t = TaskInfo(name='test-task',
+                 id=TaskID(value='test-task-id'),
+                 resources=[Cpus(0.1), Mem(16)],
+                 command=CommandInfo(value='echo 100'))
+    data = pickle.dumps(t, protocol=pickle.HIGHEST_PROTOCOL)
+    assert len(data) < len(pickle.dumps(dict(t)))
+
+    u = pickle.loads(data)
+    assert isinstance(u, TaskInfo)
+    assert isinstance(u.resources[0], Cpus)
+    assert u.cpus == 0.1
+    assert u.id == TaskID(value='test-task-id')
+    assert u.command.value == 'echo 100'
+    assert isinstance(u.status, TaskStatus)  # not a field, pickled along
+    assert u == decode(encode(t))
+
+    c = pickle.loads(pickle.dumps(Cpus(2)))
+    assert isinstance(c, Cpus)
+    assert c == 2
+
+
+def test_copy_proxies():
+    o = Offer(resources=[Cpus(1), Mem(128)])
+    c = copy.copy(o)
+    assert isinstance(c, Offer)
+    assert c == o
+    assert c.resources is o.resources
+
+    d = copy.deepcopy(o)
+    assert isinstance(d, Offer)
+    assert d.resources is not o.resources
+    assert d == o
+    assert dict.__eq__(d, o)
+
+    s = TaskStatus(task_id=TaskID(value='t'), state='TASK_RUNNING')
+    assert copy.deepcopy(s) == s
+    assert sorted(copy.deepcopy(s)) == ['state', 'task_id']
@@ -1,9 +1,16 @@
 from __future__ import absolute_import, division, print_function
 
+import copy
+import pickle
 import pytest
+import threading
 
 from six import with_metaclass
-from proxo.messages import RegisterProxies, MessageProxy, Map
+import features_pb2
+import mesos_pb2
+from sample_pb2 import MessageOfTypes
+from proxo.messages import (RegisterProxies, MessageProxy, Map, FrozenList,
+                            freeze, encode, decode)
 
 
 @pytest.fixture
@@ -104,3 +111,117 @@ def test_register_proxies():
                              ('second', Second),
                              ('first', First),
                              ('base', Base)]
+
+
+def test_flyweight_decode(registry):
+    class Nested(MessageProxy):
+        proto = MessageOfTypes.NestedType
+        flyweight = 2
+
+    first = decode(MessageOfTypes.NestedType(req='a'))
+    second = decode(MessageOfTypes.NestedType(req='a'))
+    other = decode(MessageOfTypes.NestedType(req='b'))
+
+    assert first is second
+    assert first is not other
+    assert isinstance(first, Nested)
+    assert first == Nested(req='a')
+    assert encode(first) == MessageOfTypes.NestedType(req='a')
+
+    with pytest.raises(TypeError):
+        first.req = 'c'
+    with pytest.raises(TypeError):
+        first['req'] = 'c'
+
+    decode(MessageOfTypes.NestedType(req='c'))
+    assert len(Nested.flyweights) == 2
+    assert decode(MessageOfTypes.NestedType(req='a')) is not first
+
+
+def test_freeze():
+    m = freeze(Map(a=[Map(b=1)], c={'d': 2}))
+    assert m == {'a': [{'b': 1}], 'c': {'d': 2}}
+    assert isinstance(m, Map)
+    assert isinstance(m.a, FrozenList)
+    assert hash(m) == hash(freeze(Map(a=[Map(b=1)], c={'d': 2})))
+    with pytest.raises(TypeError):
+        m.a[0].b = 2
+    with pytest.raises(TypeError):
+        m.c.update(d=3)
+    with pytest.raises(TypeError):
+        m.a.append(Map(b=2))
+    with pytest.raises(TypeError):
+        m.a += [Map(b=2)]
+
+    values = pickle.loads(pickle.dumps(freeze([1, 2])))
+    assert isinstance(values, FrozenList) and values == [1, 2]
+    assert copy.deepcopy(m) is m
+
+
+def test_flyweight_repeated_fields(registry):
+    class Labels(MessageProxy):
+        proto = mesos_pb2.Labels
+        flyweight = 8
+
+    pb = mesos_pb2.Labels()
+    pb.labels.add(key='a', value='b')
+    labels = decode(pb)
+    assert labels is decode(pb)
+    assert labels == Labels(labels=[{'key': 'a', 'value': 'b'}])
+
+
+def test_flyweights_threaded(registry):
+    class Nested(MessageProxy):
+        proto = MessageOfTypes.NestedType
+        flyweight = 4
+
+    def run():
+        for i in range(500):
+            decode(MessageOfTypes.NestedType(req=str(i % 8)))
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(Nested.flyweights) == 4
+
+
+def test_oneof_fields(registry):
+    class Event(MessageProxy):
+        proto = features_pb2.Event
+
+    e = Event(note='note')
+    assert e.note == 'note'
+    assert e.code is None and e.failed is None
+
+    decoded = decode(encode(e))
+    assert isinstance(decoded, Event)
+    assert decoded == dict(e, type='UNKNOWN')
+
+
+def test_map_fields(registry):
+    class Launched(MessageProxy):
+        proto = features_pb2.Event.Launched
+
+    class Spec(MessageProxy):
+        proto = features_pb2.Spec
+
+    assert Spec().labels == {}
+    with pytest.raises(TypeError):
+        Spec().labels['a'] = 'b'
+
+    s = Spec(codes={3: 'FAILED'}, tasks={'a': Launched(hosts=['h'])})
+    decoded = decode(encode(s))
+    assert isinstance(decoded, Spec)
+    assert isinstance(decoded.tasks['a'], Launched)
+    assert decoded.tasks['a'].hosts == ['h']
+    assert decoded.codes == {3: 'FAILED'}
+
+
+def test_registry_isolated():
+    # the proxies defined by the tests above don't leak into later decodes
+    assert not any(cls.__module__ == __name__
+                   for _, cls in MessageProxy.registry)
+    first = decode(MessageOfTypes.NestedType(req='a'))
+    assert first is not decode(MessageOfTypes.NestedType(req='a'))
@@ -0,0 +1,124 @@
+from __future__ import absolute_import, division, print_function
+
+import os
+import pickle
+import pytest
+import mesos_pb2
+
+from array import array
+from multiprocessing import Pool, shared_memory
+from proxo import decode, encode, parallel
+from proxo.instrument import instrumented
+from proxo.parallel import decode_many, decode_threaded
+from mesos import Offer, TaskID, TaskStatus
+
+
+@pytest.fixture
+def buffers():
+    return [encode(TaskStatus(task_id=TaskID(value='task-{}'.format(i)),
+                              state='TASK_RUNNING',
+                              data=b'x' * (i % 10))).SerializeToString()
+            for i in range(500)]
+
+
+def check(decoded):
+    assert len(decoded) == 500
+    for i, status in enumerate(decoded):
+        assert isinstance(status, TaskStatus)
+        assert status.task_id.value == 'task-{}'.format(i)
+        assert status.data == b'x' * (i % 10)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_decode_many(buffers, workers):
+    check(decode_many(buffers, mesos_pb2.TaskStatus, workers=workers,
+                      chunksize=64, threshold=0))
+
+
+def test_decode_many_with_pool(buffers):
+    pool = Pool(2)
+    try:
+        check(decode_many(buffers, mesos_pb2.TaskStatus, pool=pool,
+                          threshold=0))
+        check(decode_many(buffers, mesos_pb2.TaskStatus, pool=pool,
+                          threshold=0))
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def test_shared_pool(buffers):
+    try:
+        check(decode_many(buffers, mesos_pb2.TaskStatus, workers=2,
+                          threshold=0))
+        pool, = parallel._pools.values()
+        check(decode_many(buffers, mesos_pb2.TaskStatus, workers=2,
+                          threshold=0))
+        assert list(parallel._pools.values()) == [pool]
+    finally:
+        parallel.shutdown()
+    assert parallel._pools == {}
+
+
+def _mapped(name):
+    with open('/proc/self/maps') as maps:
+        return name.lstrip('/') in maps.read()
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/maps'),
+                    reason='requires procfs')
+def test_segment_detached(buffers):
+    pool = Pool(1)  # before the segment, forked workers inherit mappings
+    segment = shared_memory.SharedMemory(create=True, size=len(buffers[0]))
+    segment.buf[:len(buffers[0])] = buffers[0]
+    try:
+        assert not pool.apply(_mapped, (segment.name,))
+        task = segment.name, 'mesos.TaskStatus', array('Q', [0, len(buffers[0])])
+        status, = pickle.loads(pool.apply(parallel._decode_chunk, (task,)))
+        assert status.task_id.value == 'task-0'
+        assert not pool.apply(_mapped, (segment.name,))
+    finally:
+        pool.terminate()
+        pool.join()
+        segment.close()
+        segment.unlink()
+
+
+def test_results_not_decoded_again(buffers):
+    pool = Pool(2)  # before instrumenting, forked workers inherit the tracer
+    try:
+        with instrumented() as stats:
+            decoded = decode_many(buffers, mesos_pb2.TaskStatus, pool=pool,
+                                  threshold=0)
+        check(decoded)
+        assert stats.decodes == {}
+
+        offer = mesos_pb2.Offer(hostname='h')
+        offer.id.value, offer.framework_id.value = 'o', 'f'
+        offer.slave_id.value = 's'
+        resource = offer.resources.add(name='cpus', type=mesos_pb2.Value.SCALAR)
+        resource.scalar.value = 2
+        decoded, = decode_many([offer.SerializeToString()], mesos_pb2.Offer,
+                               pool=pool, threshold=0)
+        assert isinstance(decoded, Offer)
+        assert decoded == decode(offer)
+        assert type(decoded.resources[0]) is type(decode(offer).resources[0])
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def test_small_batches_decode_inline(buffers):
+    check(decode_many(buffers, mesos_pb2.TaskStatus, workers=2))
+
+
+@pytest.mark.parametrize('threads', [1, 4])
+def test_decode_threaded(buffers, threads):
+    check(list(decode_threaded(buffers, mesos_pb2.TaskStatus,
+                               threads=threads, chunksize=7)))
+
+
+def test_decode_threaded_early_exit(buffers):
+    decoded = decode_threaded(buffers, mesos_pb2.TaskStatus, threads=2)
+    assert next(decoded).task_id.value == 'task-0'
+    decoded.close()
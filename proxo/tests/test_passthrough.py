@@ -0,0 +1,123 @@
+from __future__ import absolute_import, division, print_function
+
+import io
+import copy
+import pytest
+import mesos_pb2
+
+from google.protobuf.message import DecodeError
+from proxo import passthrough
+from proxo.passthrough import Tracked, splice
+from proxo.stream import read_delimited, write_delimited
+from proxo.wire import encode_varint, strip_fields
+from mesos import TaskStatus, TaskID
+
+UNKNOWN = encode_varint(999 << 3) + encode_varint(42)  # field of a newer peer
+
+
+@pytest.fixture
+def data():
+    pb = mesos_pb2.TaskStatus(task_id=mesos_pb2.TaskID(value='task'),
+                              state=mesos_pb2.TASK_RUNNING, message='hello')
+    pb.labels.labels.add(key='a', value='b')
+    return pb.SerializeToString() + UNKNOWN
+
+
+def test_strip_fields(data):
+    pb = mesos_pb2.TaskStatus.FromString(data)
+    stripped = strip_fields(data, {2, 4})  # state and message
+    assert stripped.endswith(UNKNOWN)
+    assert strip_fields(data, {1000}) == data
+
+    expected = mesos_pb2.TaskStatus()
+    expected.CopyFrom(pb)
+    expected.ClearField('state')
+    expected.ClearField('message')
+    assert mesos_pb2.TaskStatus.FromString(stripped) == expected
+
+    with pytest.raises(DecodeError):
+        strip_fields(data[:-1], {2})
+
+
+def test_untouched(data):
+    proxy = passthrough.decode(data, mesos_pb2.TaskStatus)
+    assert isinstance(proxy, TaskStatus)
+    assert isinstance(proxy, Tracked)
+    assert proxy.is_running() and proxy.message == 'hello'
+    assert splice(proxy) is proxy.__dict__['_raw']
+    assert splice(proxy) == data
+
+
+def test_modified(data):
+    proxy = passthrough.decode(data, mesos_pb2.TaskStatus)
+    proxy.state = 'TASK_FINISHED'
+    proxy.task_id.value = 'renamed'  # touched through attribute access
+    del proxy['message']
+
+    out = splice(proxy)
+    assert out.endswith(mesos_pb2.TaskStatus(
+        task_id=mesos_pb2.TaskID(value='renamed'),
+        state=mesos_pb2.TASK_FINISHED).SerializeToString())
+    assert UNKNOWN in out
+
+    pb = passthrough.encode(proxy)
+    assert pb.state == mesos_pb2.TASK_FINISHED
+    assert pb.task_id.value == 'renamed'
+    assert not pb.HasField('message')
+    assert pb.labels.labels[0].key == 'a'
+
+
+def test_modified_through_views(data):
+    proxy = passthrough.decode(data, mesos_pb2.TaskStatus)
+    for k, v in proxy.items():
+        if k == 'task_id':
+            v.value = 'renamed'
+    assert passthrough.encode(proxy).task_id.value == 'renamed'
+    assert 'message' not in proxy.__dict__['_touched']  # scalars untouched
+
+    proxy = passthrough.decode(data, mesos_pb2.TaskStatus)
+    for v in proxy.values():
+        if isinstance(v, dict) and 'labels' in v:
+            v['labels'][0]['value'] = 'c'
+    assert passthrough.encode(proxy).labels.labels[0].value == 'c'
+
+    proxy = passthrough.decode(data, mesos_pb2.TaskStatus)
+    list(proxy)  # keys only
+    assert splice(proxy) == data
+
+
+def test_read_only(data):
+    proxy = passthrough.decode(data, mesos_pb2.TaskStatus)
+    assert proxy.slave_id.value == ''  # absent, decoded with defaults
+    assert proxy.labels.labels[0].key == 'a'
+    assert proxy.get('task_id').value == 'task'
+    list(proxy.items())
+    proxy.message = 'hello'  # assigned the same value
+    assert 'slave_id' in proxy.__dict__['_touched']
+    assert splice(proxy) == data
+
+    proxy.slave_id.value = 'agent'
+    proxy.labels.labels.pop()
+    pb = passthrough.encode(proxy)
+    assert pb.slave_id.value == 'agent'
+    assert len(pb.labels.labels) == 0
+
+
+def test_copy(data):
+    proxy = passthrough.decode(data, mesos_pb2.TaskStatus)
+    other = copy.copy(proxy)
+    other.task_id = TaskID(value='other')
+    assert splice(proxy) == data
+    assert passthrough.encode(other).task_id.value == 'other'
+
+
+def test_relay(data):
+    proxies = [passthrough.decode(data, mesos_pb2.TaskStatus)
+               for i in range(3)]
+    proxies[1].message = 'changed'
+
+    out = io.BytesIO()
+    write_delimited(out, proxies)
+    out.seek(0)
+    relayed = list(read_delimited(out, mesos_pb2.TaskStatus))
+    assert [s.message for s in relayed] == ['hello', 'changed', 'hello']
@@ -0,0 +1,202 @@
+from __future__ import absolute_import, division, print_function
+
+import pickle
+import pytest
+import mesos_pb2
+
+from copy import copy
+
+from features_pb2 import Envelope, Spec
+from proxo import (MessageProxy, apply_patch, decode, encode, diff,
+                   passthrough)
+from proxo.messages import Map, freeze
+from proxo.patch import REMOVED, field_mask, partial_message
+from mesos import Cpus, Mem, TaskID, TaskInfo, TaskStatus
+
+
+@pytest.fixture
+def status():
+    return TaskStatus(task_id=TaskID(value='task'), state='TASK_RUNNING',
+                      message='running', healthy=True)
+
+
+def test_identical(status):
+    assert diff(status, status) == {}
+    assert diff(status, decode(encode(status))) != {}  # defaults set
+    other = decode(encode(status))
+    assert diff(other, decode(encode(status))) == {}
+
+
+def test_changes(status):
+    new = TaskStatus(task_id=TaskID(value='task-2'), state='TASK_FAILED',
+                     healthy=True, reason='REASON_COMMAND_EXECUTOR_FAILED')
+    assert diff(status, new) == {'task_id.value': 'task-2',
+                                 'state': 'TASK_FAILED',
+                                 'message': REMOVED,
+                                 'reason': 'REASON_COMMAND_EXECUTOR_FAILED'}
+
+
+def test_shared_subtrees(status):
+    new = TaskStatus(task_id=status.task_id, state='TASK_FINISHED',
+                     message='running', healthy=True)
+    assert new.task_id is status.task_id
+    assert diff(status, new) == {'state': 'TASK_FINISHED'}
+
+
+def test_repeated_fields_replaced():
+    a = TaskInfo(name='t', resources=[Cpus(1), Mem(64)])
+    b = copy(a)
+    b.resources = [Cpus(2), Mem(64)]
+    assert diff(a, b) == {'resources': [Cpus(2), Mem(64)]}
+
+
+def test_resources_compared_structurally():
+    # scalar resources compare equal by their values only
+    a = TaskInfo(name='t', resources=[Cpus(1)])
+    b = copy(a)
+    b.resources = [Mem(1)]
+    assert Cpus(1) == Mem(1)
+    assert diff(a, b) == {'resources': [Mem(1)]}
+    pb = partial_message(diff(a, b), mesos_pb2.TaskInfo)
+    assert pb.resources[0].name == 'mem'
+
+    role = Cpus(1)
+    role.role = 'production'
+    b.resources = [role]
+    pb = partial_message(diff(a, b), mesos_pb2.TaskInfo)
+    assert pb.resources[0].role == 'production'
+
+
+def test_packed_compared_resolved(registry):
+    class EnvelopeProxy(MessageProxy):
+        proto = Envelope
+
+    pb = Envelope(id='e')
+    pb.payload.Pack(mesos_pb2.TaskID(value='x'))
+    pb.attachments.add().Pack(mesos_pb2.TaskID(value='y'))
+    pb.extras['z'].Pack(mesos_pb2.TaskID(value='z'))
+    a, b = decode(pb), decode(pb)
+    assert b.payload.value == 'x'  # resolved on one side only
+    assert b.attachments[0].value == 'y'
+    assert b.extras['z'].value == 'z'
+    assert diff(a, b) == {}
+    assert diff(b, a) == {}
+
+    b.payload = TaskID(value='other')
+    assert diff(a, b) == {'payload': TaskID(value='other')}
+
+
+def test_messages(status):
+    new = encode(status)
+    new.state = mesos_pb2.TASK_KILLED
+    assert diff(encode(status), new) == {'state': 'TASK_KILLED'}
+
+
+def test_plain_maps():
+    a = Map(a=1, b=Map(c=2, d=3))
+    b = Map(a=1, b=Map(c=4), e=5)
+    assert diff(a, b) == {'b.c': 4, 'b.d': REMOVED, 'e': 5}
+
+
+def test_field_mask(status):
+    new = TaskStatus(task_id=TaskID(value='task-2'), state='TASK_FAILED',
+                     message='running', healthy=False)
+    patch = diff(status, new)
+
+    mask = field_mask(patch)
+    assert list(mask.paths) == ['healthy', 'state', 'task_id.value']
+
+    partial = partial_message(patch, mesos_pb2.TaskStatus)
+    assert partial.task_id.value == 'task-2'
+    assert partial.HasField('healthy')
+    assert not partial.HasField('message')
+
+    target = encode(status)
+    mask.MergeMessage(partial, target)
+    assert target == encode(new)
+
+
+def test_removed_pickles():
+    assert pickle.loads(pickle.dumps(REMOVED)) is REMOVED
+
+
+@pytest.fixture
+def changed():
+    return TaskStatus(task_id=TaskID(value='task-2'), state='TASK_FAILED',
+                      healthy=True, reason='REASON_COMMAND_EXECUTOR_FAILED')
+
+
+def test_apply_to_message(status, changed):
+    target = encode(status)
+    assert apply_patch(target, diff(status, changed)) is target
+    assert target == encode(changed)
+
+
+def test_apply_to_proxy(status, changed):
+    target = TaskStatus(task_id=TaskID(value='task'), state='TASK_RUNNING',
+                        message='running', healthy=True)
+    apply_patch(target, diff(status, changed))
+    assert target == changed
+    assert isinstance(target, TaskStatus)
+    assert status.task_id.value == 'task'
+
+
+def test_apply_field_mask(status, changed):
+    patch = diff(status, changed)
+    mask, partial = field_mask(patch), partial_message(patch,
+                                                       mesos_pb2.TaskStatus)
+    target = apply_patch(encode(status), mask, partial)
+    assert target == encode(changed)
+    assert not target.HasField('message')
+
+    proxy = apply_patch(copy(status), mask, partial)
+    assert diff(proxy, changed) == {}
+
+
+def test_apply_repeated():
+    task = TaskInfo(name='t', resources=[Cpus(1)])
+    patch = {'resources': [Mem(64)]}
+
+    pb = apply_patch(encode(task), patch, repeated='append')
+    assert [r.name for r in pb.resources] == ['cpus', 'mem']
+    pb = apply_patch(encode(task), patch)
+    assert [r.name for r in pb.resources] == ['mem']
+
+    assert apply_patch(copy(task), patch, repeated='append').resources == [
+        Cpus(1), Mem(64)]
+    assert apply_patch(copy(task), patch).resources == [Mem(64)]
+
+    with pytest.raises(ValueError):
+        apply_patch(task, patch, repeated='merge')
+
+
+def test_apply_maps():
+    spec = Spec(labels={'a': '1', 'b': '2'})
+    patch = {'labels': {'b': '3', 'c': '4'}}
+
+    merged = apply_patch(spec, patch, repeated='append')
+    assert dict(merged.labels) == {'a': '1', 'b': '3', 'c': '4'}
+    replaced = apply_patch(Spec(labels={'a': '1'}), patch)
+    assert dict(replaced.labels) == {'b': '3', 'c': '4'}
+
+    proxy = apply_patch(Map(labels=Map(a='1')), patch, repeated='append')
+    assert proxy.labels == {'a': '1', 'b': '3', 'c': '4'}
+
+
+def test_apply_thaws_shared_subtrees():
+    shared = freeze(TaskID(value='task'))
+    status = TaskStatus(task_id=shared)
+    apply_patch(status, {'task_id.value': 'other',
+                         'container_status.executor_pid': 1})
+    assert status.task_id.value == 'other'
+    assert isinstance(status.task_id, TaskID)
+    assert shared.value == 'task'
+    assert status.container_status == {'executor_pid': 1}
+    assert encode(status).container_status.executor_pid == 1
+
+
+def test_apply_passthrough(status, changed):
+    proxy = passthrough.decode(encode(status).SerializeToString(),
+                               mesos_pb2.TaskStatus)
+    apply_patch(proxy, {'task_id.value': 'task-2'})
+    assert passthrough.encode(proxy).task_id.value == 'task-2'
@@ -0,0 +1,89 @@
+from __future__ import absolute_import, division, print_function
+
+import pytest
+import tracemalloc
+import mesos_pb2
+
+from proxo import decode, encode, protobuf
+from proxo.profile import allocations
+from mesos import Offer
+
+
+def offer(count):
+    pb = mesos_pb2.Offer(hostname='localhost')
+    pb.id.value = 'offer'
+    pb.framework_id.value = 'framework'
+    pb.slave_id.value = 'agent'
+    for i in range(count):
+        resource = pb.resources.add(name='cpus', type=mesos_pb2.Value.SCALAR)
+        resource.scalar.value = i
+    return pb
+
+
+def test_decode():
+    with allocations() as profile:
+        proxy = decode(offer(10))
+    assert isinstance(proxy, Offer)
+
+    rows = {(row.direction, row.path): row for row in profile.report()}
+    root = rows['decode', 'mesos.Offer']
+    assert root.type == 'mesos.Offer'
+    assert root.count == 1
+    scalar = rows['decode', 'mesos.Offer.resources.scalar']
+    assert scalar.type == 'mesos.Value.Scalar'
+    assert scalar.count == 10
+    assert scalar.objects == 20  # the proxies and their values
+    assert scalar.size > 0
+    assert rows['decode', 'mesos.Offer.id'].count == 1
+
+
+def test_encode():
+    proxy = decode(offer(5))
+    with allocations() as profile:
+        encode(proxy)
+
+    rows = {(row.direction, row.path): row for row in profile.report()}
+    assert set(direction for direction, _ in rows) == {'encode'}
+    assert rows['encode', 'mesos.Offer.resources'].count == 5
+    assert rows['encode', 'mesos.Offer.resources.scalar'].count == 5
+
+
+def test_report_sorted():
+    with allocations() as profile:
+        decode(offer(20))
+    sizes = [row.size for row in profile.report()]
+    assert sizes == sorted(sizes, reverse=True)
+    assert len(profile.report(limit=3)) == 3
+    assert 'mesos.Offer.resources (mesos.Resource)' in profile.format()
+
+
+def test_failed_conversions():
+    with allocations() as profile:
+        with pytest.raises(KeyError):
+            protobuf.dict_to_protobuf({'task_id': {'missing': 1}},
+                                      mesos_pb2.TaskStatus)
+        assert len(profile.stack) == 2  # the task status and its id
+        decode(offer(3))
+        assert profile.stack == []
+
+    rows = {(row.direction, row.path): row for row in profile.report()}
+    assert set(direction for direction, _ in rows) == {'decode'}
+    assert all(path.startswith('mesos.Offer') for _, path in rows)
+    assert rows['decode', 'mesos.Offer'].count == 1
+    assert rows['decode', 'mesos.Offer.resources.scalar'].count == 3
+
+
+def test_unwinds_on_error():
+    with pytest.raises(KeyError):
+        with allocations() as profile:
+            protobuf.dict_to_protobuf({'task_id': {'missing': 1}},
+                                      mesos_pb2.TaskStatus)
+    assert profile.stack == []
+
+
+def test_restores_state():
+    assert not tracemalloc.is_tracing()
+    with allocations():
+        assert tracemalloc.is_tracing()
+    assert not tracemalloc.is_tracing()
+    assert protobuf.tracer is None
@@ -2,6 +2,7 @@ from __future__ import absolute_import, division, print_function
 
 import pytest
 from sample_pb2 import MessageOfTypes
+from features_pb2 import Event, Spec
 from proxo import dict_to_protobuf, protobuf_to_dict
 
 
@@ -192,3 +193,44 @@ def test_reverse_type_conversion(m):
     m2 = dict_to_protobuf(d, MessageOfTypes)
 
     assert m == m2
+
+
+def test_oneof_decode():
+    e = Event(type=Event.FAILED, failed=Event.Failed(task_id='t', reason='x'))
+    d = protobuf_to_dict(e)
+    assert d == {'type': 'FAILED', 'failed': {'task_id': 't', 'reason': 'x'}}
+
+    d = protobuf_to_dict(Event(code=0))
+    assert d == {'type': 'UNKNOWN', 'code': 0}
+    assert protobuf_to_dict(Event()) == {'type': 'UNKNOWN'}
+
+
+def test_oneof_encode():
+    e = dict_to_protobuf({'note': 'n', 'launched': None}, Event)
+    assert e.WhichOneof('payload') == 'note'
+
+    e = dict_to_protobuf({'launched': {}}, Event)
+    assert e.WhichOneof('payload') == 'launched'
+
+    e = Event(launched=Event.Launched(hosts=['a', 'b']))
+    assert dict_to_protobuf(protobuf_to_dict(e), Event) == e
+
+    with pytest.raises(ValueError):
+        dict_to_protobuf({'note': 'n', 'code': 1}, Event)
+
+
+def test_map_fields():
+    s = Spec(name='spec', labels={'a': '1', 'b': '2'},
+             codes={1: Event.LAUNCHED, 2: Event.FAILED})
+    s.tasks['x'].hosts.extend(['h1', 'h2'])
+    s.tasks['y'].task_id = 'y'
+
+    d = protobuf_to_dict(s)
+    assert d['labels'] == {'a': '1', 'b': '2'}
+    assert d['codes'] == {1: 'LAUNCHED', 2: 'FAILED'}
+    assert d['tasks'] == {'x': {'task_id': '', 'hosts': ['h1', 'h2']},
+                          'y': {'task_id': 'y', 'hosts': []}}
+
+    assert dict_to_protobuf(d, Spec) == s
+    assert protobuf_to_dict(Spec()) == {'name': '', 'labels': {},
+                                        'codes': {}, 'tasks': {}}
@@ -0,0 +1,95 @@
+from __future__ import absolute_import, division, print_function
+
+import pytest
+import mesos_pb2
+
+from google.protobuf.message import DecodeError
+
+from proxo.recordio import (Decoder, decode_records, encode_record,
+                            encode_records)
+from mesos import TaskID, TaskStatus
+
+
+@pytest.fixture
+def statuses():
+    return [TaskStatus(task_id=TaskID(value='task-{}'.format(i)),
+                       state='TASK_FINISHED', data=b'\n' * i * 100)
+            for i in range(20)]
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_encode_record():
+    data = encode_record(TaskID(value='abc'))
+    assert data == b'5\n' + mesos_pb2.TaskID(value='abc').SerializeToString()
+
+
+@pytest.mark.parametrize('size', [1, 3, 1000, 10 ** 6])
+def test_roundtrip(statuses, size):
+    data = b''.join(encode_records(statuses))
+    decoded = list(decode_records(chunked(data, size), mesos_pb2.TaskStatus))
+
+    assert len(decoded) == len(statuses)
+    for status, proxy in zip(statuses, decoded):
+        assert isinstance(proxy, TaskStatus)
+        assert proxy.task_id == status.task_id
+        assert proxy.data == status.data
+
+
+def test_decoder_keeps_partial_record(statuses):
+    data = encode_record(statuses[5])
+    decoder = Decoder(mesos_pb2.TaskStatus)
+
+    assert decoder.feed(data[:2]) == []
+    assert decoder.feed(data[2:-1]) == []
+    with pytest.raises(EOFError):
+        decoder.close()
+    [status] = decoder.feed(data[-1:])
+    assert status.task_id.value == 'task-5'
+    decoder.close()
+
+
+def test_invalid_header():
+    decoder = Decoder(mesos_pb2.TaskStatus)
+    with pytest.raises(ValueError):
+        decoder.feed(b'1' * 30)
+
+
+def test_malformed_record(statuses):
+    decoder = Decoder(mesos_pb2.TaskStatus)
+    with pytest.raises(DecodeError):
+        decoder.feed(b'3\n\xff\xff\xff')
+    assert not decoder.buffer
+    decoder.close()  # the malformed record is skipped
+
+    [status] = decoder.feed(encode_record(statuses[1]))
+    assert status.task_id.value == 'task-1'
+
+
+def test_records_before_malformed(statuses):
+    good = b''.join(encode_record(status) for status in statuses[:2])
+    decoder = Decoder(mesos_pb2.TaskStatus)
+    with pytest.raises(DecodeError) as error:
+        decoder.feed(good + b'3\n\xff\xff\xff' + good)
+    records = error.value.records
+    assert [s.task_id.value for s in records] == ['task-0', 'task-1']
+    # the records after the malformed one are parsed by the next call
+    assert len(decoder.feed(b'')) == 2
+
+    chunks = [good + b'3\n\xff\xff\xff']
+    decoded = []
+    with pytest.raises(DecodeError):
+        for record in decode_records(chunks, mesos_pb2.TaskStatus):
+            decoded.append(record)
+    assert len(decoded) == 2
+
+
+@pytest.mark.parametrize('header', [b'-1\n', b'+3\n', b' 3\n', b'1_0\n',
+                                    b'\n'])
+def test_invalid_length(header):
+    decoder = Decoder(mesos_pb2.TaskStatus)
+    with pytest.raises(ValueError):
+        decoder.feed(header + b'abc')
+    decoder.close()
@@ -0,0 +1,70 @@
+from __future__ import absolute_import, division, print_function
+
+import io
+import pytest
+import mesos_pb2
+
+from proxo.stream import (decode_varint, encode_varint, read_delimited,
+                          write_delimited)
+from mesos import TaskID, TaskStatus
+
+
+@pytest.fixture
+def statuses():
+    return [TaskStatus(task_id=TaskID(value='task-{}'.format(i)),
+                       state='TASK_RUNNING', message='x' * i)
+            for i in range(200)]
+
+
+class Unbuffered(object):
+
+    def __init__(self, data):
+        self.data = io.BytesIO(data)
+
+    def read(self, size):
+        return self.data.read(min(size, 7))
+
+
+def test_varint():
+    for value in [0, 1, 127, 128, 300, 2 ** 32, 2 ** 64 - 1]:
+        data = encode_varint(value)
+        assert decode_varint(bytearray(data)) == (value, len(data))
+    assert decode_varint(bytearray(b'\x80\x80')) == (None, 0)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 16, 65536])
+def test_roundtrip(statuses, chunk_size):
+    fp = io.BytesIO()
+    write_delimited(fp, statuses, chunk_size=chunk_size)
+    fp.seek(0)
+
+    decoded = list(read_delimited(fp, mesos_pb2.TaskStatus,
+                                  chunk_size=chunk_size))
+    assert len(decoded) == len(statuses)
+    for status, proxy in zip(statuses, decoded):
+        assert isinstance(proxy, TaskStatus)
+        assert proxy.task_id.value == status.task_id.value
+        assert proxy.message == status.message
+        assert proxy.state == 'TASK_RUNNING'
+
+
+def test_read_without_readinto(statuses):
+    fp = io.BytesIO()
+    write_delimited(fp, statuses)
+
+    decoded = list(read_delimited(Unbuffered(fp.getvalue()),
+                                  mesos_pb2.TaskStatus, chunk_size=4))
+    assert [d.message for d in decoded] == [s.message for s in statuses]
+
+
+def test_truncated_stream(statuses):
+    fp = io.BytesIO()
+    write_delimited(fp, statuses[:3])
+    fp = io.BytesIO(fp.getvalue()[:-1])
+
+    with pytest.raises(EOFError):
+        list(read_delimited(fp, mesos_pb2.TaskStatus))
+
+
+def test_empty_stream():
+    assert list(read_delimited(io.BytesIO(), mesos_pb2.TaskStatus)) == []
@@ -0,0 +1,207 @@
+from __future__ import absolute_import, division, print_function
+
+import json
+import pytest
+
+from copy import copy
+from datetime import datetime, timedelta, tzinfo
+from google.protobuf import json_format
+import mesos_pb2
+from features_pb2 import Envelope, Heartbeat
+from mesos import TaskID, TaskStatus
+from proxo import (MessageProxy, decode, encode, dict_to_protobuf,
+                   protobuf_to_dict)
+from proxo.json import dumps, loads
+from proxo.messages import Map
+from proxo.protobuf import (TYPE_CALLABLE_MAP, REVERSE_TYPE_CALLABLE_MAP,
+                            decode_plan, encode_plan)
+from proxo.wellknown import (NANOSECOND_TYPES, REVERSE_NANOSECOND_TYPES,
+                             Packed, message_class)
+
+
+class CET(tzinfo):
+
+    def utcoffset(self, dt):
+        return timedelta(hours=1)
+
+    def dst(self, dt):
+        return timedelta(0)
+
+
+@pytest.fixture
+def h():
+    h = Heartbeat()
+    h.time.FromDatetime(datetime(2020, 2, 29, 12, 30, 1, 500))
+    h.interval.FromTimedelta(timedelta(seconds=-1, microseconds=-250))
+    h.details.update({'host': 'a', 'ports': [1.0, 2.0], 'up': True,
+                      'extra': None})
+    h.load.value = 0.5
+    h.counter.value = 2 ** 40
+    h.history.add(seconds=1)
+    h.values['x'].string_value = 'y'
+    return h
+
+
+def test_decode(h):
+    d = protobuf_to_dict(h)
+    assert d == {'time': datetime(2020, 2, 29, 12, 30, 1, 500),
+                 'interval': timedelta(seconds=-1, microseconds=-250),
+                 'details': {'host': 'a', 'ports': [1, 2], 'up': True,
+                             'extra': None},
+                 'load': 0.5,
+                 'counter': 2 ** 40,
+                 'history': [datetime(1970, 1, 1, 0, 0, 1)],
+                 'values': {'x': 'y'}}
+    assert dict_to_protobuf(d, Heartbeat) == h
+
+
+def test_unset():
+    assert protobuf_to_dict(Heartbeat()) == {'history': [], 'values': {}}
+
+    h = Heartbeat(load={'value': 0})
+    assert protobuf_to_dict(h) == {'load': 0, 'history': [], 'values': {}}
+    assert dict_to_protobuf({'load': 0, 'counter': None}, Heartbeat) == h
+
+
+def test_aware_datetime():
+    h = dict_to_protobuf({'time': datetime(2020, 1, 1, 1, tzinfo=CET())},
+                         Heartbeat)
+    assert h.time.ToDatetime() == datetime(2020, 1, 1)
+
+
+def test_nanoseconds(h):
+    converters = copy(TYPE_CALLABLE_MAP)
+    converters.update(NANOSECOND_TYPES)
+    d = protobuf_to_dict(h, converters=converters)
+    assert d['time'] == h.time.ToNanoseconds()
+    assert d['interval'] == -1000250000
+    assert d['history'] == [10 ** 9]
+
+    converters = copy(REVERSE_TYPE_CALLABLE_MAP)
+    converters.update(REVERSE_NANOSECOND_TYPES)
+    assert dict_to_protobuf(d, Heartbeat, converters=converters) == h
+
+
+def test_plans_cached():
+    fields, _, plan = decode_plan(Heartbeat.DESCRIPTOR)
+    assert decode_plan(Heartbeat.DESCRIPTOR)[0] is fields
+    assert plan['time'].convert is TYPE_CALLABLE_MAP[
+        'google.protobuf.Timestamp']
+    assert plan['time'].optional and not plan['history'].optional
+    assert plan['values'].mapping
+
+    converters = dict(TYPE_CALLABLE_MAP, **NANOSECOND_TYPES)
+    other = decode_plan(Heartbeat.DESCRIPTOR, converters)[2]
+    assert other['time'].convert is NANOSECOND_TYPES[
+        'google.protobuf.Timestamp']
+
+    plan = encode_plan(Envelope.DESCRIPTOR)
+    assert encode_plan(Envelope.DESCRIPTOR) is plan
+    assert set(plan) == {'payload', 'attachments', 'extras'}
+    assert all(packed for _, packed in plan.values())
+
+
+def test_plans_follow_converter_changes(h):
+    name = 'google.protobuf.Timestamp'
+    assert isinstance(protobuf_to_dict(h)['time'], datetime)
+    original = TYPE_CALLABLE_MAP[name]
+    TYPE_CALLABLE_MAP[name] = NANOSECOND_TYPES[name]
+    try:
+        assert protobuf_to_dict(h)['time'] == h.time.ToNanoseconds()
+    finally:
+        TYPE_CALLABLE_MAP[name] = original
+    assert isinstance(protobuf_to_dict(h)['time'], datetime)
+
+    name = 'google.protobuf.Duration'
+    original = REVERSE_TYPE_CALLABLE_MAP.pop(name)
+    try:
+        with pytest.raises(AttributeError):  # converted like a message
+            dict_to_protobuf({'interval': timedelta(seconds=1)}, Heartbeat)
+    finally:
+        REVERSE_TYPE_CALLABLE_MAP[name] = original
+    assert dict_to_protobuf({'interval': timedelta(seconds=1)},
+                            Heartbeat).interval.seconds == 1
+
+
+def test_json(h):
+    proxy = decode(h)
+    assert json.loads(dumps(proxy, Heartbeat.DESCRIPTOR)) == (
+        json_format.MessageToDict(h))
+    proxy = loads(json_format.MessageToJson(h), Heartbeat)
+    assert dict_to_protobuf(proxy, Heartbeat) == h
+
+
+@pytest.fixture
+def envelope():
+    envelope = Envelope(id='e')
+    envelope.payload.Pack(mesos_pb2.TaskStatus(
+        task_id=mesos_pb2.TaskID(value='t'), state=mesos_pb2.TASK_RUNNING))
+    envelope.attachments.add().Pack(mesos_pb2.TaskID(value='a'))
+    envelope.attachments.add().Pack(mesos_pb2.TaskID(value='b'))
+    envelope.extras['x'].Pack(mesos_pb2.TaskID(value='x'))
+    return envelope
+
+
+def test_packed(envelope):
+    d = protobuf_to_dict(envelope)
+    assert isinstance(d['payload'], Packed)
+    assert d['payload'].message() == mesos_pb2.TaskStatus(
+        task_id=mesos_pb2.TaskID(value='t'), state=mesos_pb2.TASK_RUNNING)
+    assert d['payload'].type_url == envelope.payload.type_url
+    assert message_class(d['payload'].type_url) is mesos_pb2.TaskStatus
+    assert isinstance(d['extras']['x'], Packed)
+    assert d['extras']['x'].message() == mesos_pb2.TaskID(value='x')
+    assert dict_to_protobuf(d, Envelope) == envelope
+
+
+def test_any_proxies(envelope, registry):
+    class EnvelopeProxy(MessageProxy):
+        proto = Envelope
+
+    proxy = decode(envelope)
+    assert isinstance(proxy, EnvelopeProxy)
+    assert isinstance(proxy['payload'], Packed)  # resolved lazily
+    assert encode(proxy) == envelope
+
+    assert isinstance(proxy.payload, TaskStatus)
+    assert proxy.payload.is_running()
+    assert proxy['payload'] is proxy.payload
+    assert [item.value for item in proxy.attachments] == ['a', 'b']
+    assert isinstance(proxy.attachments[0], TaskID)
+
+    assert decode(encode(proxy)).payload == proxy.payload
+    proxy.payload = TaskID(value='c')
+    assert encode(proxy).payload.Is(mesos_pb2.TaskID.DESCRIPTOR)
+
+
+def test_any_maps(envelope, registry):
+    class EnvelopeProxy(MessageProxy):
+        proto = Envelope
+
+    proxy = decode(envelope)
+    assert isinstance(proxy['extras']['x'], Packed)
+    assert isinstance(proxy.extras['x'], TaskID)
+    assert proxy.extras['x'].value == 'x'
+    assert encode(proxy) == envelope
+
+    lost = TaskStatus(task_id=TaskID(value='z'), state='TASK_LOST')
+    proxy = EnvelopeProxy(id='e', extras={'y': TaskID(value='y'), 'z': lost})
+    pb = encode(proxy)
+    assert pb.extras['y'].Is(mesos_pb2.TaskID.DESCRIPTOR)
+    assert pb.extras['z'].Is(mesos_pb2.TaskStatus.DESCRIPTOR)
+    extras = decode(pb).extras
+    assert extras['y'] == TaskID(value='y')
+    assert isinstance(extras['z'], TaskStatus)
+    assert extras['z'].task_id.value == 'z'
+
+
+def test_any_generic(envelope):
+    proxy = protobuf_to_dict(envelope, containers=[(Envelope, Map)])
+    assert isinstance(proxy.payload, TaskStatus)
+    assert proxy.attachments[1] == TaskID(value='b')
+    assert proxy.extras['x'] == TaskID(value='x')
+
+
+def test_any_json(envelope):
+    tree = json.loads(dumps(decode(envelope), Envelope.DESCRIPTOR))
+    assert tree == json_format.MessageToDict(envelope)
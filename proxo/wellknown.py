@@ -0,0 +1,238 @@
+from __future__ import absolute_import, division, print_function
+
+from operator import attrgetter
+from datetime import datetime, timedelta
+
+import six
+from google.protobuf import any_pb2, duration_pb2, struct_pb2, timestamp_pb2
+from google.protobuf import wrappers_pb2, symbol_database
+from google.protobuf.message import Message
+
+__all__ = ('Packed',
+           'message_class',
+           'WELL_KNOWN_TYPES',
+           'REVERSE_WELL_KNOWN_TYPES',
+           'NANOSECOND_TYPES',
+           'REVERSE_NANOSECOND_TYPES')
+
+
+# converters of the well-known types keyed by the message full name, these
+# take precedence over the recursive message conversion
+
+EPOCH = datetime(1970, 1, 1)
+NANOS = 10 ** 9
+
+
+def timestamp_to_datetime(pb):
+    # naive UTC datetime, like Timestamp.ToDatetime
+    return EPOCH + timedelta(seconds=pb.seconds,
+                             microseconds=pb.nanos // 1000)
+
+
+def datetime_to_timestamp(value):
+    if value.tzinfo is not None:
+        value = value.replace(tzinfo=None) - value.utcoffset()
+    delta = value - EPOCH
+    return timestamp_pb2.Timestamp(
+        seconds=delta.days * 86400 + delta.seconds,
+        nanos=delta.microseconds * 1000)
+
+
+def timestamp_to_nanos(pb):
+    return pb.seconds * NANOS + pb.nanos
+
+
+def nanos_to_timestamp(value):
+    seconds, nanos = divmod(value, NANOS)  # nanos are never negative
+    return timestamp_pb2.Timestamp(seconds=seconds, nanos=nanos)
+
+
+def duration_to_timedelta(pb):
+    return timedelta(seconds=pb.seconds, microseconds=pb.nanos / 1000)
+
+
+def timedelta_to_duration(value):
+    micros = (value.days * 86400 + value.seconds) * 10 ** 6
+    return nanos_to_duration((micros + value.microseconds) * 1000)
+
+
+def duration_to_nanos(pb):
+    return pb.seconds * NANOS + pb.nanos
+
+
+def nanos_to_duration(value):
+    # seconds and nanos carry the same sign
+    seconds, nanos = divmod(abs(value), NANOS)
+    sign = -1 if value < 0 else 1
+    return duration_pb2.Duration(seconds=sign * seconds, nanos=sign * nanos)
+
+
+def value_to_python(pb):
+    kind = pb.WhichOneof('kind')
+    if kind == 'struct_value':
+        return struct_to_dict(pb.struct_value)
+    elif kind == 'list_value':
+        return list_value_to_list(pb.list_value)
+    elif kind is None or kind == 'null_value':
+        return None
+    return getattr(pb, kind)
+
+
+def struct_to_dict(pb):
+    return {k: value_to_python(v) for k, v in pb.fields.items()}
+
+
+def list_value_to_list(pb):
+    return [value_to_python(v) for v in pb.values]
+
+
+def _fill_value(pb, value):
+    if value is None:
+        pb.null_value = struct_pb2.NULL_VALUE
+    elif isinstance(value, bool):
+        pb.bool_value = value
+    elif isinstance(value, six.integer_types + (float,)):
+        pb.number_value = value
+    elif isinstance(value, six.string_types):
+        pb.string_value = value
+    elif isinstance(value, dict):
+        _fill_struct(pb.struct_value, value)
+    elif isinstance(value, (list, tuple)):
+        _fill_list_value(pb.list_value, value)
+    else:
+        raise TypeError('{!r} cannot be stored in a Struct'.format(value))
+
+
+def _fill_struct(pb, value):
+    pb.SetInParent()
+    for k, v in value.items():
+        _fill_value(pb.fields[k], v)
+
+
+def _fill_list_value(pb, values):
+    pb.SetInParent()
+    for v in values:
+        _fill_value(pb.values.add(), v)
+
+
+def python_to_value(value):
+    pb = struct_pb2.Value()
+    _fill_value(pb, value)
+    return pb
+
+
+def dict_to_struct(value):
+    pb = struct_pb2.Struct()
+    _fill_struct(pb, value)
+    return pb
+
+
+def list_to_list_value(values):
+    pb = struct_pb2.ListValue()
+    _fill_list_value(pb, values)
+    return pb
+
+
+_message_classes = {}
+
+
+def message_class(type_url):
+    # cached, the symbol database is only consulted once per type url
+    try:
+        return _message_classes[type_url]
+    except KeyError:
+        pass
+
+    full_name = type_url.rpartition('/')[2]
+    cls = symbol_database.Default().GetSymbol(full_name)
+    return _message_classes.setdefault(type_url, cls)
+
+
+class Packed(object):
+    # Any payload kept serialized until it's accessed, proxies resolve it
+    # into the registered proxy of the packed message type
+    __slots__ = ('type_url', 'value')
+
+    def __init__(self, type_url, value):
+        self.type_url = type_url
+        self.value = value
+
+    def message(self):
+        pb = message_class(self.type_url)()
+        pb.ParseFromString(self.value)
+        return pb
+
+    def __eq__(self, other):
+        return (isinstance(other, Packed) and
+                self.type_url == other.type_url and self.value == other.value)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.type_url, self.value))
+
+    def __repr__(self):
+        return 'Packed({!r}, {!r})'.format(self.type_url, self.value)
+
+
+def any_to_packed(pb):
+    return Packed(pb.type_url, pb.value)
+
+
+def pack(value):
+    pb = any_pb2.Any()
+    if isinstance(value, Packed):
+        pb.type_url, pb.value = value.type_url, value.value
+    elif isinstance(value, Message):
+        pb.Pack(value)
+    else:
+        raise TypeError('{!r} cannot be packed into Any'.format(value))
+    return pb
+
+
+WRAPPERS = (wrappers_pb2.DoubleValue, wrappers_pb2.FloatValue,
+            wrappers_pb2.Int64Value, wrappers_pb2.UInt64Value,
+            wrappers_pb2.Int32Value, wrappers_pb2.UInt32Value,
+            wrappers_pb2.BoolValue, wrappers_pb2.StringValue,
+            wrappers_pb2.BytesValue)
+
+
+def _box(cls):
+    return lambda value: cls(value=value)
+
+
+WELL_KNOWN_TYPES = {
+    'google.protobuf.Timestamp': timestamp_to_datetime,
+    'google.protobuf.Duration': duration_to_timedelta,
+    'google.protobuf.Struct': struct_to_dict,
+    'google.protobuf.Value': value_to_python,
+    'google.protobuf.ListValue': list_value_to_list,
+    'google.protobuf.Any': any_to_packed
+}
+WELL_KNOWN_TYPES.update((cls.DESCRIPTOR.full_name, attrgetter('value'))
+                        for cls in WRAPPERS)
+
+REVERSE_WELL_KNOWN_TYPES = {
+    'google.protobuf.Timestamp': datetime_to_timestamp,
+    'google.protobuf.Duration': timedelta_to_duration,
+    'google.protobuf.Struct': dict_to_struct,
+    'google.protobuf.Value': python_to_value,
+    'google.protobuf.ListValue': list_to_list_value,
+    'google.protobuf.Any': pack
+}
+REVERSE_WELL_KNOWN_TYPES.update((cls.DESCRIPTOR.full_name, _box(cls))
+                                for cls in WRAPPERS)
+
+# integer nanoseconds instead of datetime objects, the mapping is compiled
+# into plans per message type so build it once, e.g.
+# NANOSECONDS = dict(TYPE_CALLABLE_MAP, **NANOSECOND_TYPES)
+# protobuf_to_dict(pb, converters=NANOSECONDS)
+NANOSECOND_TYPES = {
+    'google.protobuf.Timestamp': timestamp_to_nanos,
+    'google.protobuf.Duration': duration_to_nanos
+}
+REVERSE_NANOSECOND_TYPES = {
+    'google.protobuf.Timestamp': nanos_to_timestamp,
+    'google.protobuf.Duration': nanos_to_duration
+}
@@ -0,0 +1,85 @@
+from __future__ import absolute_import, division, print_function
+
+from google.protobuf.message import DecodeError
+
+__all__ = ('encode_varint',
+           'decode_varint',
+           'skip_field',
+           'strip_fields')
+
+
+VARINT, FIXED64, LENGTH_DELIMITED, START_GROUP, END_GROUP, FIXED32 = range(6)
+
+
+def encode_varint(value):
+    out = bytearray()
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def decode_varint(buffer, pos=0, end=None):
+    # returns (value, new position) or (None, pos) if the buffer is exhausted
+    end = len(buffer) if end is None else end
+    result = shift = 0
+    for i in range(pos, end):
+        byte = buffer[i]
+        result |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return result, i + 1
+        shift += 7
+        if shift >= 64:
+            raise ValueError('Too many bytes when decoding varint')
+    return None, pos
+
+
+def _varint(buffer, pos, end):
+    value, new = decode_varint(buffer, pos, end)
+    if value is None:
+        raise DecodeError('Truncated message')
+    return value, new
+
+
+def skip_field(buffer, pos, wire_type, end):
+    # position after the value of a field whose tag ends at pos
+    if wire_type == VARINT:
+        _, pos = _varint(buffer, pos, end)
+    elif wire_type == FIXED64:
+        pos += 8
+    elif wire_type == FIXED32:
+        pos += 4
+    elif wire_type == LENGTH_DELIMITED:
+        length, pos = _varint(buffer, pos, end)
+        pos += length
+    elif wire_type == START_GROUP:
+        while True:
+            tag, pos = _varint(buffer, pos, end)
+            if tag & 7 == END_GROUP:
+                break
+            pos = skip_field(buffer, pos, tag & 7, end)
+    else:
+        raise DecodeError('Unexpected wire type {}'.format(wire_type))
+    if pos > end:
+        raise DecodeError('Truncated message')
+    return pos
+
+
+def strip_fields(data, numbers):
+    # copies the serialized message without the given field numbers, the
+    # remaining fields (unknown ones included) are kept byte for byte
+    view, end = memoryview(data), len(data)
+    out = bytearray()
+    pos = keep = 0
+    while pos < end:
+        start = pos
+        tag, pos = _varint(view, pos, end)
+        pos = skip_field(view, pos, tag & 7, end)
+        if tag >> 3 in numbers:
+            out += view[keep:start]
+            keep = pos
+    if not keep:
+        return bytes(data)
+    out += view[keep:end]
+    return bytes(out)
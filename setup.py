@@ -16,7 +16,13 @@ setup(name='proxo',
       packages=['proxo'],
       long_description=(open('README.rst').read() if exists('README.rst')
                         else ''),
-      install_requires=['protobuf'],
+      classifiers=['Programming Language :: Python :: 3',
+                   'Programming Language :: Python :: 3 :: Only'],
+      python_requires='>=3.8',  # asyncio streams and shared memory
+      install_requires=['protobuf', 'six'],
+      extras_require={'columnar': ['numpy'],
+                      'arrow': ['pyarrow'],
+                      'json': ['orjson']},
       setup_requires=['pytest-runner'],
       tests_require=['pytest'],
       zip_safe=False)